@@ -6,12 +6,29 @@
 
 import lib.stddraw as stddraw  # for creating an animation with user interactions
 from lib.picture import Picture  # used for displaying an image on the game menu
-from lib.color import Color  # used for coloring the game menu
 import os  # the os module is used for file and directory operations
 from game_grid import GameGrid  # the class for modeling the game grid
 from tetromino import Tetromino  # the class for modeling the tetrominoes
+from tetromino import TETROMINO_TYPES  # the types of the tetrominoes
 import random  # used for creating tetrominoes with random types (shapes)
+import time  # used for timing the automatic fall of the tetrominoes
 from point import Point  # used for the positions of the tetrominoes
+from board_renderer import BoardRenderer  # used for drawing the whole grid at once
+import menu  # the shared widgets and event loop of the game menus
+from input_handler import InputHandler  # used for handling the keyboard input
+from menu import Button  # used for the clickable buttons on the menus
+from rollout import RolloutAdvisor  # used for suggesting the placements
+from worker_bridge import WorkerBridge  # used for suggesting in the background
+from leaderboard import Leaderboard  # used for saving the scores of the games
+from rewind import RewindBuffer  # used for rewinding the game (practice mode)
+
+
+# the number of times the game window is redrawn per second
+FRAME_RATE = 60
+# the names of the difficulties by their speeds (see display_difficulty_menu)
+DIFFICULTY_NAMES = {1000: "Easy", 500: "Medium", 150: "Hard"}
+# the number of top scores shown on the game menu
+N_TOP_SCORES = 3
 
 
 # The main function where this program starts execution
@@ -29,20 +46,42 @@ def start():
     Tetromino.grid_height = grid_h
     Tetromino.grid_width = grid_w
     # create the game grid
-    grid = GameGrid(grid_h, grid_w)
+    grid = create_game_grid(grid_h, grid_w)
     current_tetromino = create_tetromino()
     grid.current_tetromino = current_tetromino
     next_tetromino = create_tetromino()
-    highest_number = None
+    grid.next_tetromino = next_tetromino
+    # the saved scores of the previous games
+    leaderboard = Leaderboard()
     # display a simple menu before opening the game
     # by using the display_game_menu function defined below
     speed = display_game_menu(grid_h, grid_w + 4)
+    # the input handler that auto-repeats the held movement keys
+    input_handler = InputHandler()
+    input_handler.reset()
+    # the time at which the active tetromino falls down by one (auto fall)
+    next_fall_time = time.perf_counter() + speed / 1000
+    stddraw.resetFrameClock()
+    # the start time of the current game
+    game_start_time = time.perf_counter()
+    # the hint mode ("hint") outlines the suggested placement of the active
+    # tetromino and the autoplay mode ("autoplay") also moves the tetromino
+    # there, the suggestions are computed in the background (None: both off)
+    advisor_mode = None
+    advisor, bridge = None, None
+    # the number of tetrominoes created so far (identifies the active one)
+    n_tetrominoes = 1
+    # the snapshots of the last ticks for rewinding the game, a rewound game
+    # is a practice game and its score is not saved
+    rewind_buffer = RewindBuffer(grid)
+    rewind_buffer.record(current_tetromino, next_tetromino, n_tetrominoes)
+    practice = False
 
     # the main game loop
-    while True:
-        # check for any user interaction via the keyboard
-        if stddraw.hasNextKeyTyped():  # check if the user has pressed a key
-            key_typed = stddraw.nextKeyTyped()  # the most recently pressed key
+    running = True
+    while running:
+        # handle every key pressed (or auto-repeated) since the last iteration
+        for key_typed in input_handler.get_actions():
             # if the left arrow key has been pressed
             if key_typed == "left":
                 # move the active tetromino left by one
@@ -56,7 +95,6 @@ def start():
                 # move the active tetromino down by one
                 # (soft drop: causes the tetromino to fall down faster)
                 current_tetromino.move(key_typed, grid)
-            # clear the queue of the pressed keys for a smoother interaction
 
             elif key_typed == "up":
                 current_tetromino.rotate_cw(grid)
@@ -66,55 +104,170 @@ def start():
 
             elif key_typed == "space":
                 current_tetromino.hard_drop(grid)
+                # lock the dropped tetromino without waiting for the auto fall
+                next_fall_time = time.perf_counter()
 
             elif key_typed == "p":
                 display_pause_menu(grid_h, grid_w + 4, grid.score)
+                # ignore the keys pressed while the game was paused
+                input_handler.reset()
+                # do not count the pause as a delay of the auto fall
+                next_fall_time = time.perf_counter() + speed / 1000
+                stddraw.resetFrameClock()
+                break
+
+            elif key_typed == "r":
+                # start or stop recording the game (e.g. for bug reports)
+                toggle_recording()
+
+            elif key_typed == "backspace":
+                # rewind the game by one tick (practice mode)
+                restored = rewind_buffer.rewind()
+                if restored is not None:
+                    current_tetromino, next_tetromino, n_tetrominoes = restored
+                    practice = True
+                    next_fall_time = time.perf_counter() + speed / 1000
+
+            elif key_typed == "h" or key_typed == "a":
+                mode = "hint" if key_typed == "h" else "autoplay"
+                advisor_mode = None if advisor_mode == mode else mode
+                # the worker processes are started the first time
+                if advisor is None:
+                    advisor = RolloutAdvisor()
+                    bridge = WorkerBridge(advisor.suggest_placement)
+                if advisor_mode is None:
+                    bridge.cancel()
+                    grid.hint = None
 
             elif key_typed == "q":
+                running = False
                 break
 
-            stddraw.clearKeysTyped()
-
-        # move the active tetromino down by one at each iteration (auto fall)
-        success = current_tetromino.move("down", grid)
+        if not running:
+            break
+
+        # move the active tetromino down by one every speed ms (auto fall)
+        # on a fixed schedule, so the timing does not depend on the time spent
+        # on drawing the frames
+        now = time.perf_counter()
+        success = True
+        ticked = now >= next_fall_time
+        if ticked:
+            next_fall_time += speed / 1000
+            # restart the schedule instead of falling repeatedly to catch up
+            if next_fall_time < now:
+                next_fall_time = now + speed / 1000
+            success = current_tetromino.move("down", grid)
         # lock the active tetromino onto the grid when it cannot go down anymore
         if not success:
-            # get the tile matrix of the tetromino without empty rows and columns
-            # and the position of the bottom left cell in this matrix
-            tiles, pos = current_tetromino.get_min_bounded_tile_matrix(True)
-            # update the game grid by locking the tiles of the landed tetromino
-            game_over = grid.update_grid(tiles, pos)
-            # end the main game loop if the game is over
-
-            grid.remove_full_rows()
+            # lock the tiles of the landed tetromino and apply the rules
+            game_over = grid.lock_tetromino(current_tetromino)
 
             if game_over:
-                speed = display_game_menu(grid_h, grid_w + 4, grid.score, highest_number)
+                # save the score (in the background) and show the top scores
+                difficulty = DIFFICULTY_NAMES[speed]
+                # the highest number reached in the game (2048 or more for a
+                # win, even if the tile is not on the grid anymore)
+                highest_number = grid.get_peak_number()
+                if not practice:
+                    leaderboard.record(difficulty, grid.score, highest_number,
+                                       grid.n_locked,
+                                       time.perf_counter() - game_start_time)
+                top_scores = leaderboard.get_top_scores(difficulty, N_TOP_SCORES)
+                speed = display_game_menu(grid_h, grid_w + 4, grid.score,
+                                          highest_number, difficulty, top_scores)
+                input_handler.reset()
+                next_fall_time = time.perf_counter() + speed / 1000
+                stddraw.resetFrameClock()
+                game_start_time = time.perf_counter()
                 grid.reset()
-                grid = GameGrid(grid_h, grid_w)
+                grid = create_game_grid(grid_h, grid_w)
                 current_tetromino = create_tetromino()
                 grid.current_tetromino = current_tetromino
+                rewind_buffer = RewindBuffer(grid)
+                practice = False
 
             # create the next tetromino to enter the game grid
             # by using the create_tetromino function defined below
             current_tetromino = next_tetromino
             grid.current_tetromino = current_tetromino
             next_tetromino = create_tetromino()
-            highest_number = current_tetromino.get_highest_number()
+            grid.next_tetromino = next_tetromino
+            n_tetrominoes += 1
+
+        # take a snapshot of the game after each tick (automatic fall or lock)
+        if ticked or not success:
+            rewind_buffer.record(current_tetromino, next_tetromino, n_tetrominoes)
+
+        # update the suggested placement of the active tetromino without
+        # waiting for it (a new suggestion is computed when the grid or the
+        # active tetromino changes)
+        if advisor_mode is not None:
+            key = (grid.board_hash, n_tetrominoes)
+            if key != bridge.key:
+                bridge.post(key, grid.get_exponent_matrix(), grid.score,
+                            current_tetromino.get_rotation_states())
+            grid.hint = bridge.poll(key)
+            # move the active tetromino to the suggested placement and lock it
+            if advisor_mode == "autoplay" and grid.hint is not None \
+                    and apply_suggestion(current_tetromino, grid.hint):
+                next_fall_time = time.perf_counter()
 
         # display the game grid with the current tetromino
         grid.display(next_tetromino)
 
-        stddraw.show(speed)
-
+        # redraw the window at a constant frame rate
+        stddraw.showFrame(FRAME_RATE)
+
+    # save the frames recorded so far
+    if stddraw.isRecording():
+        toggle_recording()
+    # stop computing the suggestions
+    if advisor is not None:
+        bridge.close()
+        advisor.close()
+    # write the scores that are not saved yet
+    leaderboard.close()
     # print a message on the console when the game is over
     print("Game over")
 
 
+# A function for starting or stopping the recording of the displayed frames
+# (the frames are saved as numbered PNG files in a new directory under the
+# recordings directory placed next to this python code file)
+def toggle_recording():
+    if stddraw.isRecording():
+        n_frames = stddraw.stopRecording()
+        print("Recording saved (" + str(n_frames) + " frames)")
+    else:
+        current_dir = os.path.dirname(os.path.realpath(__file__))
+        recording_dir = current_dir + "/recordings/" + time.strftime("%Y%m%d-%H%M%S")
+        stddraw.startRecording(recording_dir)
+        print("Recording to " + recording_dir)
+
+
+# A function for moving the given tetromino to the given suggested placement
+# (which may have been computed before the tetromino was rotated), returns
+# False if the tetromino cannot take the tiles of the placement
+def apply_suggestion(tetromino, placement):
+    for rotation, cells in tetromino.get_rotation_states():
+        if cells == placement.cells:
+            tetromino.apply_placement(placement._replace(rotation=rotation))
+            return True
+    return False
+
+
+# A function for creating an empty game grid that is drawn by a BoardRenderer
+def create_game_grid(grid_h, grid_w):
+    grid = GameGrid(grid_h, grid_w)
+    grid.renderer = BoardRenderer(grid.empty_cell_color, grid.line_color)
+    return grid
+
+
 # A function for creating random shaped tetrominoes to enter the game grid
 def create_tetromino():
     # the type (shape) of the tetromino is determined randomly
-    tetromino_types = ['I', 'O', 'Z', 'S', 'T', 'J', 'L']
+    tetromino_types = TETROMINO_TYPES
     random_index = random.randint(0, len(tetromino_types) - 1)
     random_type = tetromino_types[random_index]
     # create and return the tetromino
@@ -123,13 +276,10 @@ def create_tetromino():
 
 
 # A function for displaying a simple menu before starting the game
-def display_game_menu(grid_height, grid_width, score=None, highest_number=None):
-    # the colors used for the menu
-    background_color = Color(42, 69, 99)
-    button_color = Color(25, 255, 228)
-    text_color = Color(31, 160, 239)
-    # clear the background drawing canvas to background_color
-    stddraw.clear(background_color)
+def display_game_menu(grid_height, grid_width, score=None, highest_number=None,
+                      difficulty=None, top_scores=None):
+    # clear the background drawing canvas to the menu background color
+    menu.clear_menu()
     # get the directory in which this python code file is placed
     current_dir = os.path.dirname(os.path.realpath(__file__))
     # compute the path of the image file
@@ -142,63 +292,34 @@ def display_game_menu(grid_height, grid_width, score=None, highest_number=None):
     stddraw.picture(image_to_display, img_center_x, img_center_y)
     # the dimensions for the start game button
     button_w, button_h = grid_width - 1.5, 2
-    # the coordinates of the bottom left corner for the start game button
-    button_blc_x, button_blc_y = img_center_x - button_w / 2, 4
-    # add the start game button as a filled rectangle
-    stddraw.setPenColor(button_color)
-    stddraw.filledRectangle(button_blc_x, button_blc_y, button_w, button_h)
-    # add the text on the start game button
-    stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(25)
-    stddraw.setPenColor(text_color)
-    text_to_display = "Click Here to Start the Game"
-    stddraw.text(img_center_x, 5, text_to_display)
+    # add the start game button with its bottom left corner below the image
+    start_button = Button(img_center_x - button_w / 2, 4, button_w, button_h,
+                          "Click Here to Start the Game")
+    start_button.draw()
 
     if score is not None:
-        stddraw.setFontFamily("Arial")
-        stddraw.setFontSize(20)
-        stddraw.setPenColor(text_color)
-        score_text = "Your Score: " + str(score)
-        stddraw.text(img_center_x, 7, score_text)
+        menu.draw_text(img_center_x, 7, "Your Score: " + str(score))
 
     if highest_number is not None:
         if highest_number >= 2048:
-            stddraw.setFontFamily("Arial")
-            stddraw.setFontSize(20)
-            stddraw.setPenColor(text_color)
-            highest_number_text = "Congratulations! You reached 2048!"
-            stddraw.text(img_center_x, 8, highest_number_text)
-
+            menu.draw_text(img_center_x, 8, "Congratulations! You reached 2048!")
         else:
-            stddraw.setFontFamily("Arial")
-            stddraw.setFontSize(20)
-            stddraw.setPenColor(text_color)
-            highest_number_text = "You Lost :("
-            stddraw.text(img_center_x, 8, highest_number_text)
-
-    # the user interaction loop for the simple menu
-    while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
-        # check if the mouse has been left-clicked on the start game button
-        if stddraw.mousePressed():
-            # get the coordinates of the most recent location at which the mouse
-            # has been left-clicked
-            mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
-            # check if these coordinates are inside the button
-            if mouse_x >= button_blc_x and mouse_x <= button_blc_x + button_w:
-                if mouse_y >= button_blc_y and mouse_y <= button_blc_y + button_h:
-                    speed = display_controls_menu(grid_height, grid_width)
-                    return speed
+            menu.draw_text(img_center_x, 8, "You Lost :(")
+
+    # show the top scores of the difficulty of the finished game
+    if top_scores:
+        menu.draw_text(img_center_x, 2.5, "Top Scores (" + difficulty + "): " +
+                       "  ".join(str(result[0]) for result in top_scores))
+
+    # wait (without polling) until the start game button is clicked
+    menu.wait_for_button([start_button])
+    speed = display_controls_menu(grid_height, grid_width)
+    return speed
 
 
 def display_pause_menu(grid_height, grid_width, score=None):
-    # the colors used for the menu
-    background_color = Color(42, 69, 99)
-    button_color = Color(25, 255, 228)
-    text_color = Color(31, 160, 239)
-    # clear the background drawing canvas to background_color
-    stddraw.clear(background_color)
+    # clear the background drawing canvas to the menu background color
+    menu.clear_menu()
     # get the directory in which this python code file is placed
     current_dir = os.path.dirname(os.path.realpath(__file__))
     # compute the path of the image file
@@ -209,134 +330,72 @@ def display_pause_menu(grid_height, grid_width, score=None):
     image_to_display = Picture(img_file)
     # add the image to the drawing canvas
     stddraw.picture(image_to_display, img_center_x, img_center_y)
-    # the dimensions for the start game button
+    # the dimensions for the resume game button
     button_w, button_h = grid_width - 1.5, 2
-    # the coordinates of the bottom left corner for the start game button
-    button_blc_x, button_blc_y = img_center_x - button_w / 2, 4
-    # add the start game button as a filled rectangle
-    stddraw.setPenColor(button_color)
-    stddraw.filledRectangle(button_blc_x, button_blc_y, button_w, button_h)
-    # add the text on the start game button
-    stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(25)
-    stddraw.setPenColor(text_color)
-    text_to_display = "Click Here to Resume the Game"
-    stddraw.text(img_center_x, 5, text_to_display)
+    # add the resume game button with its bottom left corner below the image
+    resume_button = Button(img_center_x - button_w / 2, 4, button_w, button_h,
+                           "Click Here to Resume the Game")
+    resume_button.draw()
 
     if score is not None:
-        stddraw.setFontFamily("Arial")
-        stddraw.setFontSize(20)
-        stddraw.setPenColor(text_color)
-        score_text = "Your Score: " + str(score)
-        stddraw.text(img_center_x, 7, score_text)
-
-    while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
-        # check if the mouse has been left-clicked on the start game button
-        if stddraw.mousePressed():
-            # get the coordinates of the most recent location at which the mouse
-            # has been left-clicked
-            mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
-            # check if these coordinates are inside the button
-            if mouse_x >= button_blc_x and mouse_x <= button_blc_x + button_w:
-                if mouse_y >= button_blc_y and mouse_y <= button_blc_y + button_h:
-                    break  # break the loop to end the method and start the game
+        menu.draw_text(img_center_x, 7, "Your Score: " + str(score))
+
+    # wait (without polling) until the resume game button is clicked
+    menu.wait_for_button([resume_button])
 
 
 def display_difficulty_menu(grid_height, grid_width):
-    # the colors used for the menu
-    background_color = Color(42, 69, 99)
-    button_color = Color(25, 255, 228)
-    text_color = Color(31, 160, 239)
-    # clear the background drawing canvas to background_color
-    stddraw.clear(background_color)
+    # clear the background drawing canvas to the menu background color
+    menu.clear_menu()
     # the dimensions for the difficulty buttons
     button_w, button_h = grid_width - 1.5, 2
-    # the coordinates of the bottom left corner for the difficulty buttons
+    # the x coordinate of the bottom left corner for the difficulty buttons
     button_blc_x = (grid_width - 1) / 2 - button_w / 2
-    button_blc_y = [grid_height - 10, grid_height - 14, grid_height - 18]  # for easy, medium, hard
-    # add the difficulty buttons as filled rectangles
-    stddraw.setPenColor(button_color)
-    for y in button_blc_y:
-        stddraw.filledRectangle(button_blc_x, y, button_w, button_h)
-    # add the text on the difficulty buttons
-    stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(25)
-    stddraw.setPenColor(text_color)
-    difficulties = ["Easy", "Medium", "Hard"]
-    for i, difficulty in enumerate(difficulties):
-        stddraw.text((grid_width - 1) / 2, button_blc_y[i] + 1, difficulty)
-    # the user interaction loop for the difficulty menu
-    while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
-        # check if the mouse has been left-clicked on any difficulty button
-        if stddraw.mousePressed():
-            # get the coordinates of the most recent location at which the mouse
-            # has been left-clicked
-            mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
-            # check if these coordinates are inside any button
-            for i, y in enumerate(button_blc_y):
-                if mouse_x >= button_blc_x and mouse_x <= button_blc_x + button_w:
-                    if mouse_y >= y and mouse_y <= y + button_h:
-                        if difficulties[i] == "Easy":
-                            speed = 1000
-                        elif difficulties[i] == "Medium":
-                            speed = 500
-                        else:
-                            speed = 150
-                        return speed
+    # the difficulty buttons with the speed (ms per gravity tick) of each one
+    buttons = [Button(button_blc_x, grid_height - 10, button_w, button_h,
+                      "Easy", value=1000),
+               Button(button_blc_x, grid_height - 14, button_w, button_h,
+                      "Medium", value=500),
+               Button(button_blc_x, grid_height - 18, button_w, button_h,
+                      "Hard", value=150)]
+    for button in buttons:
+        button.draw()
+    # wait (without polling) until any difficulty button is clicked
+    speed = menu.wait_for_button(buttons)
+    return speed
 
 
 def display_controls_menu(grid_height, grid_width):
-    # the colors used for the menu
-    background_color = Color(42, 69, 99)
-    button_color = Color(25, 255, 228)
-    text_color = Color(31, 160, 239)
-    # clear the background drawing canvas to background_color
-    stddraw.clear(background_color)
+    # clear the background drawing canvas to the menu background color
+    menu.clear_menu()
     # the dimensions for the controls info box
     box_w, box_h = grid_width - 1.5, 10
-    # the coordinates of the bottom left corner for the controls info box
-    box_blc_x = (grid_width - 1) / 2 - box_w / 2
-    box_blc_y = (grid_height - 1) / 2 - box_h / 2
-    # add the controls info box as a filled rectangle
-    stddraw.setPenColor(button_color)
-    stddraw.filledRectangle(box_blc_x, box_blc_y, box_w, box_h)
+    # add the controls info box as a button without a label
+    info_box = Button((grid_width - 1) / 2 - box_w / 2,
+                      (grid_height - 1) / 2 - box_h / 2, box_w, box_h)
+    info_box.draw()
     # add the text on the controls info box
-    stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(20)
-    stddraw.setPenColor(text_color)
     controls_info = ["Controls:", "Left Arrow: Move Left", "Right Arrow: Move Right",
                      "Down Arrow: Soft Drop", "Up Arrow: Rotate Clockwise",
                      "Z: Rotate Counter-Clockwise", "Space: Hard Drop",
-                     "P: Pause Game", "Q: Quit Game"]
+                     "P: Pause Game", "R: Start/Stop Recording",
+                     "Backspace: Rewind (Practice)",
+                     "H: Show/Hide Hint", "A: Start/Stop Autoplay", "Q: Quit Game"]
     for i, info in enumerate(controls_info):
-        stddraw.text((grid_width - 1) / 2, box_blc_y + box_h - 1 - i, info)
-    # the user interaction loop for the controls menu
+        menu.draw_text((grid_width - 1) / 2,
+                       info_box.blc_y + box_h - 1 - i * 0.7, info)
 
     # the dimensions for the choose difficulty button
     button_w, button_h = grid_width - 1.5, 2
-    # the coordinates of the bottom left corner for the choose difficulty button
-    button_blc_x, button_blc_y = (grid_width - 1) / 2 - button_w / 2, 2
-    # add the choose difficulty button as a filled rectangle
-    stddraw.setPenColor(button_color)
-    stddraw.filledRectangle(button_blc_x, button_blc_y, button_w, button_h)
-    # add the text on the choose difficulty button
-    stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(25)
-    stddraw.setPenColor(text_color)
-    text_to_display = "Choose Difficulty"
-    stddraw.text((grid_width - 1) / 2, 3, text_to_display)
-
-    while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
-        # check if the mouse has been left-clicked anywhere
-        if stddraw.mousePressed():
-            speed = display_difficulty_menu(grid_height, grid_width)
-            return speed
+    # add the choose difficulty button
+    difficulty_button = Button((grid_width - 1) / 2 - button_w / 2, 2,
+                               button_w, button_h, "Choose Difficulty")
+    difficulty_button.draw()
+
+    # wait (without polling) until the mouse is left-clicked anywhere
+    menu.wait_for_button()
+    speed = display_difficulty_menu(grid_height, grid_width)
+    return speed
 
 
 # start() function is specified as the entry point (main function) from which
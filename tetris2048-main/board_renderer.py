@@ -0,0 +1,103 @@
+import os
+
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+import pygame  # used for building the board image in one operation
+import pygame.surfarray
+import numpy as np  # used for turning the board into pixels without loops
+
+import lib.stddraw as stddraw  # used for drawing the board image on the canvas
+from tile import Tile  # used for the font of the tiles
+from tile import get_tile_colors  # the colors of the tiles
+# the color and the thickness in pixels of the tile boundaries
+from tile import BOUNDARY_COLOR, get_boundary_pixels
+
+# the palette indexes reserved for the tile boundaries and the grid lines
+# (the other indexes are the exponents of the tile numbers, 0 is empty)
+_BOUNDARY_INDEX, _LINE_INDEX = 254, 255
+
+
+# A function that converts a Color object into an (r, g, b) tuple
+def _rgb(color):
+    return color.getRed(), color.getGreen(), color.getBlue()
+
+
+# A class for drawing all the locked tiles of a game grid with a single image
+# upload: the grid is converted into an 8-bit image of palette indexes (the
+# exponents of the numbers) that is colored by one palette lookup while it is
+# copied onto the canvas, and the number labels are copied from pre-rendered
+# glyphs only for the occupied cells
+class BoardRenderer:
+    # A constructor for creating a renderer with the colors of a game grid
+    def __init__(self, empty_cell_color, line_color, blc_x=-0.5, blc_y=-0.5):
+        # the position of the bottom left corner of the board on the canvas
+        self.blc_x, self.blc_y = blc_x, blc_y
+        # the palette maps each exponent of a tile number to its color
+        self.palette = np.zeros((256, 3), dtype=np.uint8)
+        self.palette[0] = _rgb(empty_cell_color)
+        for exponent in range(1, _BOUNDARY_INDEX):
+            self.palette[exponent] = _rgb(get_tile_colors(exponent)[0])
+        self.palette[_BOUNDARY_INDEX] = _rgb(BOUNDARY_COLOR)
+        self.palette[_LINE_INDEX] = _rgb(line_color)
+        # the glyph atlas: the rendered label of each exponent
+        self.glyphs = {}
+        self.font = None
+        # the pixel size of a cell, the cell masks and the board surface are
+        # (re)created when the size of the board in pixels changes
+        self.cell_size = None
+        self.surface = None
+
+    # A method for (re)creating the pixel buffers for the given board size
+    def _prepare(self, n_rows, n_cols):
+        cell_w, cell_h = stddraw.pixelSize(1, 1)
+        if self.surface is not None and self.cell_size == (cell_w, cell_h) \
+                and self.surface.get_size() == (n_cols * cell_w, n_rows * cell_h):
+            return
+        self.cell_size = cell_w, cell_h
+        # an 8-bit surface is colored by its palette when it is blitted
+        self.surface = pygame.Surface((n_cols * cell_w, n_rows * cell_h), depth=8)
+        self.surface.set_palette([tuple(rgb) for rgb in self.palette])
+        # the boundary of a tile is drawn on the inner pixels of its cell
+        thickness = get_boundary_pixels()
+        ys, xs = np.indices((cell_h, cell_w))
+        boundary_mask = (xs < thickness) | (xs >= cell_w - thickness) | \
+                        (ys < thickness) | (ys >= cell_h - thickness)
+        # the grid lines are drawn on the left and the top pixels of a cell
+        line_mask = (xs == 0) | (ys == 0)
+        # the masks repeated for every cell of the board
+        self.boundary_mask = np.tile(boundary_mask, (n_rows, n_cols))
+        self.line_mask = np.tile(line_mask, (n_rows, n_cols))
+        self.font = pygame.font.SysFont(Tile.font_family, Tile.font_size)
+        self.glyphs = {}
+
+    # A method that returns the rendered label for the given exponent
+    def _glyph(self, exponent):
+        glyph = self.glyphs.get(exponent)
+        if glyph is None:
+            number = 2 ** int(exponent)
+            color = _rgb(get_tile_colors(int(exponent))[1])
+            glyph = self.font.render(str(number), True, color)
+            self.glyphs[exponent] = glyph
+        return glyph
+
+    # A method for drawing a board given as a matrix of exponents (row 0 is
+    # the bottom row) on the canvas
+    def draw(self, exponents):
+        n_rows, n_cols = exponents.shape
+        self._prepare(n_rows, n_cols)
+        cell_w, cell_h = self.cell_size
+        # the palette index of each pixel (the rows of an image go from top
+        # to bottom) is the exponent of the number in its cell
+        indexes = np.repeat(np.repeat(exponents[::-1].astype(np.uint8), cell_h,
+                                      axis=0), cell_w, axis=1)
+        occupied = indexes > 0
+        indexes[occupied & self.boundary_mask] = _BOUNDARY_INDEX
+        indexes[~occupied & self.line_mask] = _LINE_INDEX
+        # surfarray uses (x, y) indexing
+        pygame.surfarray.blit_array(self.surface, indexes.T)
+        stddraw.blit(self.surface, self.blc_x, self.blc_y)
+        # copy the labels of the occupied cells from the glyph atlas
+        for row, col in zip(*np.nonzero(exponents)):
+            glyph = self._glyph(exponents[row, col])
+            glyph_w, glyph_h = glyph.get_size()
+            stddraw.blit(glyph, self.blc_x + col + 0.5 - glyph_w / (2 * cell_w),
+                         self.blc_y + row + 0.5 - glyph_h / (2 * cell_h))
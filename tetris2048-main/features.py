@@ -0,0 +1,96 @@
+import numpy as np  # used for computing the features without Python loops
+
+# the names of the features that have a single value per board, in the order
+# of the columns of the matrix returned by get_feature_matrix
+SCALAR_FEATURES = ["aggregate_height", "max_height", "bumpiness", "holes",
+                   "wells", "row_transitions", "column_transitions",
+                   "equal_pairs", "monotonicity", "n_tiles"]
+
+
+# A function that computes the features of a board given as a matrix of the
+# exponents of the tile numbers (see GameGrid.get_exponent_matrix, row 0 is the
+# bottom row) or of a stack of boards with the shape (n_boards, rows, cols),
+# e.g. np.array([state.cells for state in board_states]) for BoardState objects.
+# It returns a dictionary of arrays that have one value (or one row) per board:
+# - "heights": the height of each column (rows, cols -> cols values)
+# - "aggregate_height", "max_height": the sum and the maximum of the heights
+# - "bumpiness": the sum of the height differences of the adjacent columns
+# - "holes": the number of empty cells below the top of their column
+# - "wells": the sum of the depths of the columns that are lower than both of
+#   their neighbors (the walls count as full columns)
+# - "row_transitions", "column_transitions": the number of changes between
+#   occupied and empty cells along the rows and the columns (the walls and the
+#   floor count as occupied)
+# - "equal_pairs": the number of adjacent (horizontally or vertically) tiles
+#   with equal numbers
+# - "exponent_counts": the number of tiles with each exponent (index 0 is the
+#   number of empty cells)
+# - "monotonicity": the number of vertically adjacent tile pairs whose lower
+#   tile has a number greater than or equal to the upper tile minus the number
+#   of the other pairs
+# - "n_tiles": the number of tiles
+# (the arrays of a single board are indexed without the board index)
+def get_features(exponents):
+    boards = np.asarray(exponents)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[np.newaxis]
+    n_boards, n_rows, n_cols = boards.shape
+    occupied = boards > 0
+    row_indexes = np.arange(n_rows)[np.newaxis, :, np.newaxis]
+
+    # the Tetris features
+    heights = np.max(np.where(occupied, row_indexes + 1, 0), axis=1)
+    below_top = row_indexes < heights[:, np.newaxis, :]
+    holes = np.sum(below_top & ~occupied, axis=(1, 2))
+    bumpiness = np.sum(np.abs(np.diff(heights, axis=1)), axis=1)
+    walls = np.pad(heights, ((0, 0), (1, 1)), constant_values=n_rows)
+    well_depths = np.minimum(walls[:, :-2], walls[:, 2:]) - heights
+    wells = np.sum(np.maximum(well_depths, 0), axis=1)
+    with_walls = np.pad(occupied, ((0, 0), (0, 0), (1, 1)), constant_values=True)
+    row_transitions = np.sum(with_walls[:, :, 1:] != with_walls[:, :, :-1],
+                             axis=(1, 2))
+    with_floor = np.pad(occupied, ((0, 0), (1, 0), (0, 0)), constant_values=True)
+    column_transitions = np.sum(with_floor[:, 1:, :] != with_floor[:, :-1, :],
+                                axis=(1, 2))
+
+    # the 2048 features
+    vertical_equal = occupied[:, 1:, :] & (boards[:, 1:, :] == boards[:, :-1, :])
+    horizontal_equal = occupied[:, :, 1:] & (boards[:, :, 1:] == boards[:, :, :-1])
+    equal_pairs = np.sum(vertical_equal, axis=(1, 2)) + \
+        np.sum(horizontal_equal, axis=(1, 2))
+    vertical_pairs = occupied[:, 1:, :] & occupied[:, :-1, :]
+    decreasing = vertical_pairs & (boards[:, :-1, :] >= boards[:, 1:, :])
+    monotonicity = 2 * np.sum(decreasing, axis=(1, 2)) - \
+        np.sum(vertical_pairs, axis=(1, 2))
+    # count the exponents of all the boards with a single bincount by giving
+    # each board its own range of bins
+    n_bins = max(int(boards.max(initial=0)) + 1, 12)
+    offsets = np.arange(n_boards)[:, np.newaxis, np.newaxis] * n_bins
+    exponent_counts = np.bincount((boards.astype(np.int64) + offsets).ravel(),
+                                  minlength=n_boards * n_bins)
+    exponent_counts = exponent_counts.reshape(n_boards, n_bins)
+
+    features = {"heights": heights,
+                "aggregate_height": np.sum(heights, axis=1),
+                "max_height": np.max(heights, axis=1),
+                "bumpiness": bumpiness,
+                "holes": holes,
+                "wells": wells,
+                "row_transitions": row_transitions,
+                "column_transitions": column_transitions,
+                "equal_pairs": equal_pairs,
+                "exponent_counts": exponent_counts,
+                "monotonicity": monotonicity,
+                "n_tiles": np.sum(occupied, axis=(1, 2))}
+    if single:
+        features = {name: values[0] for name, values in features.items()}
+    return features
+
+
+# A function that returns the scalar features (see SCALAR_FEATURES) of a board
+# or a stack of boards as a vector or an (n_boards, n_features) matrix, e.g. for
+# scoring boards by a weighted sum of their features
+def get_feature_matrix(exponents):
+    features = get_features(exponents)
+    return np.stack([features[name] for name in SCALAR_FEATURES], axis=-1)
@@ -2,12 +2,12 @@ import copy
 
 import lib.stddraw as stddraw  # used for displaying the game grid
 from lib.color import Color  # used for coloring the game grid
-from point import Point  # used for tile positions
 import numpy as np  # fundamental Python module for scientific computing
 
-from tetromino import Tetromino
+from tetromino import Tetromino, find_placements
 from tile import Tile
 from random import choice
+import zobrist  # used for hashing the state of the game
 
 
 # A class for modeling the game grid
@@ -17,7 +17,9 @@ def get_next_display_dict(grid_width):
 
 class GameGrid:
     # A constructor for creating the game grid based on the given arguments
-    def __init__(self, grid_h, grid_w):
+    # (renderer is an optional object for drawing all the locked tiles and the
+    # grid lines at once, such as a board_renderer.BoardRenderer)
+    def __init__(self, grid_h, grid_w, renderer=None):
         # set the dimensions of the game grid as the given arguments
         self.grid_height = grid_h
         self.grid_width = grid_w
@@ -25,7 +27,32 @@ class GameGrid:
         self.tile_matrix = np.full((grid_h, grid_w), None)
         # create the tetromino that is currently being moved on the game grid
         self.current_tetromino = None
-        # create the tetromino that will enter the game grid next
+        # the tetromino that will enter the game grid next (used for hashing)
+        self.next_tetromino = None
+        # the exponents of the numbers of the locked tiles (0 for an empty cell)
+        # and the Zobrist hash value of the locked tiles, both kept up to date
+        # by the set_tile method
+        self.exponent_matrix = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        self.zobrist_keys = zobrist.get_cell_keys(grid_h, grid_w)
+        self.board_hash = 0
+        # the number of cells with each exponent (exponent_counts[0] is the
+        # number of empty cells) and the highest exponent on the locked tiles,
+        # both kept up to date by the set_tile method
+        self.exponent_counts = [0] * (zobrist.MAX_EXPONENT + 1)
+        self.exponent_counts[0] = grid_h * grid_w
+        self.highest_exponent = 0
+        # the highest exponent that has been on the locked tiles since the
+        # start of the game (it never decreases, so a 2048 tile that is later
+        # merged away or removed with a full row still counts as a win)
+        self.peak_exponent = 0
+        # the (row, col) cells whose numbers have changed since the last merge
+        # pass (kept up to date by set_tile) and the cells deferred to the next
+        # merge pass (see Tile.merge_tiles and MergeWorklist)
+        self.changed_cells = set()
+        self.deferred_merge_cells = set()
+        # the rows with changed cells since the last call of pop_changed_rows
+        # (e.g. for the snapshots of a rewind.RewindBuffer)
+        self.changed_rows = set()
         # the game_over flag shows whether the game is over or not
         self.game_over = False
         # set the color used for the empty grid cells
@@ -33,11 +60,26 @@ class GameGrid:
         # set the colors used for the grid lines and the grid boundaries
         self.line_color = Color(185, 171, 158)
         self.boundary_color = Color(132, 122, 113)
+        # set the color used for the texts next to the game grid
+        self.text_color = Color(69, 60, 51)
         # thickness values used for the grid lines and the grid boundaries
         self.line_thickness = 0.002
         self.box_thickness = 10 * self.line_thickness
         # the score of the game starts from 0
         self.score = 0
+        # the number of locked tetrominoes, merged tile pairs, removed full rows
+        # and removed floating tiles since the start of the game
+        self.n_locked, self.n_merges, self.n_lines_cleared = 0, 0, 0
+        self.n_floating_removed = 0
+        # the functions called with this grid when the game is over (after the
+        # last tetromino is locked and the rules are applied)
+        self.game_over_listeners = []
+        # the renderer used for drawing the locked tiles (None: tile by tile)
+        self.renderer = renderer
+        # the suggested placement of the current tetromino (see
+        # rollout.RolloutAdvisor) that is outlined on the grid, or None
+        self.hint = None
+        self.hint_color = Color(69, 60, 51)
 
     # A method for displaying the game grid
     def display(self, next_tetromino):
@@ -45,22 +87,21 @@ class GameGrid:
         stddraw.clear(self.empty_cell_color)
         # draw the game grid
         self.draw_grid()
+        # outline the suggested placement of the current tetromino (if any)
+        if self.hint is not None:
+            self.draw_hint()
         # draw the current/active tetromino if it is not None
         # (the case when the game grid is updated)
         if self.current_tetromino is not None:
             self.current_tetromino.draw()
         # draw a box around the game grid
         self.draw_boundaries()
-        # show the resulting drawing with a pause duration = 250 ms
-        self.score = Tile.merge_tiles(self.tile_matrix, self.score)
-
-        self.remove_floating_tetrominos()
 
         self.display_next_tetromino(next_tetromino)
 
     def display_score(self):
         stddraw.setFontSize(28)
-        stddraw.setPenColor(Color(69, 60, 51))
+        stddraw.setPenColor(self.text_color)
         stddraw.text(self.grid_width + 1.5, self.grid_height - 17.5, "Score")
         stddraw.setFontFamily("Arial")
         stddraw.text(self.grid_width + 1.5, self.grid_height - 18 - 0.8, str(self.score))
@@ -70,13 +111,18 @@ class GameGrid:
 
     # A method for drawing the cells and the lines of the game grid
     def draw_grid(self):
+        # draw the whole grid at once when a renderer is used
+        if self.renderer is not None:
+            self.renderer.draw(self.get_exponent_matrix())
+            self.display_score()
+            return
         # for each cell of the game grid
         for row in range(self.grid_height):
             for col in range(self.grid_width):
                 # if the current grid cell is occupied by a tile
                 if self.tile_matrix[row][col] is not None:
                     # draw this tile
-                    self.tile_matrix[row][col].draw(Point(col, row))
+                    self.tile_matrix[row][col].draw_at(col, row)
         # draw the inner lines of the game grid
         stddraw.setPenColor(self.line_color)
         stddraw.setPenRadius(self.line_thickness)
@@ -90,6 +136,16 @@ class GameGrid:
         stddraw.setPenRadius()  # reset the pen radius to its default value
         self.display_score()
 
+    # A method for drawing the outlines of the cells of the suggested placement
+    def draw_hint(self):
+        stddraw.setPenColor(self.hint_color)
+        stddraw.setPenRadius(self.box_thickness / 2)
+        for dx, dy, number in self.hint.cells:
+            row, col = self.hint.row + dy, self.hint.col + dx
+            if row < self.grid_height:
+                stddraw.square(col, row, 0.45)
+        stddraw.setPenRadius()  # reset the pen radius to its default value
+
     # A method for drawing the boundaries around the game grid
     def draw_boundaries(self):
         # draw a bounding box around the game grid as a rectangle
@@ -102,6 +158,101 @@ class GameGrid:
         stddraw.rectangle(pos_x, pos_y, self.grid_width, self.grid_height)
         stddraw.setPenRadius()  # reset the pen radius to its default value
 
+    # A method that returns the grid as a matrix of the exponents of the tile
+    # numbers (e.g. 3 for 8) where 0 denotes an empty cell
+    def get_exponent_matrix(self):
+        return self.exponent_matrix.copy()
+
+    # A method for placing the given tile (or None to empty the cell) at the
+    # given cell of the grid (all the changes to the locked tiles, including
+    # changing the number on a locked tile, must be made with this method so
+    # that the exponent matrix and the hash value stay up to date)
+    def set_tile(self, row, col, tile):
+        self.tile_matrix[row][col] = tile
+        exponent = 0 if tile is None else tile.number.bit_length() - 1
+        old_exponent = self.exponent_matrix[row, col]
+        if exponent != old_exponent:
+            keys = self.zobrist_keys[row][col]
+            self.board_hash ^= keys[old_exponent] ^ keys[exponent]
+            self.exponent_matrix[row, col] = exponent
+            self.changed_cells.add((row, col))
+            self.changed_rows.add(row)
+            counts = self.exponent_counts
+            counts[old_exponent] -= 1
+            counts[exponent] += 1
+            if exponent > self.highest_exponent:
+                self.highest_exponent = exponent
+                if exponent > self.peak_exponent:
+                    self.peak_exponent = exponent
+            elif old_exponent == self.highest_exponent:
+                # the highest tile is gone when its exponent is not left on the
+                # grid, the next highest exponent is at most 63 steps below
+                while self.highest_exponent and not counts[self.highest_exponent]:
+                    self.highest_exponent -= 1
+
+    # A method that returns the cells changed since the last call (as a set of
+    # (row, col) tuples) and starts collecting the changed cells again
+    def pop_changed_cells(self):
+        changed_cells, self.changed_cells = self.changed_cells, set()
+        return changed_cells
+
+    # A method that returns the rows changed since the last call (as a set of
+    # row indexes) and starts collecting the changed rows again
+    def pop_changed_rows(self):
+        changed_rows, self.changed_rows = self.changed_rows, set()
+        return changed_rows
+
+    # A method that returns the 64-bit Zobrist hash value of the state of the
+    # game: the locked tiles, the current tetromino and the next tetromino
+    def get_hash(self):
+        return self.board_hash ^ zobrist.get_piece_key(self.current_tetromino, 0) \
+            ^ zobrist.get_piece_key(self.next_tetromino, 1)
+
+    # A method that returns the highest number on the locked tiles (0 if the
+    # grid is empty)
+    def get_highest_number(self):
+        exponent = self.highest_exponent
+        return 2 ** exponent if exponent else 0
+
+    # A method that returns the highest number that has been on the locked
+    # tiles since the start of the game (0 if no tile has been locked)
+    def get_peak_number(self):
+        exponent = self.peak_exponent
+        return 2 ** exponent if exponent else 0
+
+    # A method that returns the number of locked tiles with each number as a
+    # dictionary sorted by the numbers (e.g. {2: 10, 4: 3, 16: 1})
+    def get_number_counts(self):
+        return {2 ** exponent: count for exponent, count
+                in enumerate(self.exponent_counts[:self.highest_exponent + 1])
+                if exponent and count}
+
+    # A method that returns the sum of the numbers on the locked tiles (the
+    # score to be added if all the locked tiles were removed)
+    def get_total_number(self):
+        return sum(2 ** exponent * count for exponent, count
+                   in enumerate(self.exponent_counts[:self.highest_exponent + 1])
+                   if exponent)
+
+    # A method that returns the height of each column of the grid (the row
+    # index above the topmost tile in the column, 0 for an empty column)
+    def get_column_heights(self):
+        heights = [0] * self.grid_width
+        for col in range(self.grid_width):
+            for row in range(self.grid_height - 1, -1, -1):
+                if self.tile_matrix[row][col] is not None:
+                    heights[col] = row + 1
+                    break
+        return heights
+
+    # A method that returns every distinct final resting placement of the
+    # given tetromino as a list of Placement objects, assuming that it is
+    # dropped straight down from above the grid after being rotated and moved
+    # horizontally (the placements that do not fit in the grid are omitted)
+    def get_placements(self, tetromino):
+        return find_placements(self.get_column_heights(), self.grid_height,
+                               tetromino.get_rotation_states())
+
     # A method used checking whether the grid cell with the given row and column
     # indexes is occupied by a tile or not (i.e., empty)
     def is_occupied(self, row, col):
@@ -134,17 +285,50 @@ class GameGrid:
                 # place each tile (occupied cell) onto the game grid
                 if tiles_to_lock[row][col] is not None:
                     # compute the position of the tile on the game grid
-                    pos = Point()
-                    pos.x = blc_position.x + col
-                    pos.y = blc_position.y + (n_rows - 1) - row
-                    if self.is_inside(pos.y, pos.x):
-                        self.tile_matrix[pos.y][pos.x] = tiles_to_lock[row][col]
+                    x = blc_position.x + col
+                    y = blc_position.y + (n_rows - 1) - row
+                    if self.is_inside(y, x):
+                        self.set_tile(y, x, tiles_to_lock[row][col])
                     # the game is over if any placed tile is above the game grid
                     else:
                         self.game_over = True
         # return the value of the game_over flag
         return self.game_over
 
+    # A method for locking the given tetromino that cannot go down anymore onto
+    # the grid and applying the rules (see settle), returns True if the game is
+    # over
+    def lock_tetromino(self, tetromino):
+        # get the tile matrix of the tetromino without empty rows and columns
+        # and the position of the bottom left cell in this matrix
+        tiles, pos = tetromino.get_min_bounded_tile_matrix(True)
+        # update the game grid by locking the tiles of the landed tetromino
+        game_over = self.update_grid(tiles, pos)
+        self.n_locked += 1
+        # merge the tiles and remove the floating tiles and the full rows
+        self.settle()
+        if game_over:
+            for listener in self.game_over_listeners:
+                listener(self)
+        return game_over
+
+    # A method that applies the merging, floating tile and full row rules
+    # after a tetromino is locked until no rule changes the grid anymore
+    # (the game grid is only drawn by the display method, so these rules do
+    # not depend on how often the grid is displayed)
+    def settle(self):
+        # the rows completed by the locked tetromino are cleared first (before
+        # a merge can break them)
+        self.remove_full_rows()
+        while True:
+            previous_score = self.score
+            self.score = Tile.merge_tiles(self, self.score)
+            self.remove_floating_tetrominos()
+            n_removed_rows = self.remove_full_rows()
+            # every merge, floating tile and full row increases the score
+            if self.score == previous_score and n_removed_rows == 0:
+                break
+
     # A method for removing the full rows from the game grid and updating the
     # game grid by shifting down the tiles above the removed rows
     def remove_full_rows(self):
@@ -158,6 +342,7 @@ class GameGrid:
         # remove the full rows from the game grid
         for row in reversed(full_rows):
             self.remove_row(row)
+        self.n_lines_cleared += len(full_rows)
         # return the number of full rows removed from the game grid
         return len(full_rows)
 
@@ -176,9 +361,9 @@ class GameGrid:
         # remove the given row from the game grid
         for r in range(row, self.grid_height - 1):
             for col in range(self.grid_width):
-                self.tile_matrix[r][col] = self.tile_matrix[r + 1][col]
+                self.set_tile(r, col, self.tile_matrix[r + 1][col])
         for col in range(self.grid_width):
-            self.tile_matrix[self.grid_height - 1][col] = None
+            self.set_tile(self.grid_height - 1, col, None)
 
     # A method for calculating the score when deleting a row
     def calculate_score(self, row):
@@ -193,29 +378,28 @@ class GameGrid:
         # Set all tiles in the grid to None
         for row in range(self.grid_height):
             for col in range(self.grid_width):
-                self.tile_matrix[row][col] = None
+                self.set_tile(row, col, None)
 
-        # Reset the score
+        # Reset the score and the counters
         self.score = 0
+        self.n_locked, self.n_merges, self.n_lines_cleared = 0, 0, 0
+        self.n_floating_removed = 0
+        self.peak_exponent = 0
 
         self.current_tetromino = None
 
 
     def display_next_tetromino(self, next_tetromino):
         # Define the position where the next Tetromino will be displayed
-        display_position = Point(self.grid_width + 0.75, self.grid_height - 4)
+        display_x, display_y = self.grid_width + 0.75, self.grid_height - 4
 
         # Iterate over the tiles of the next Tetromino
         for row in range(next_tetromino.tile_matrix.shape[0]):
             for col in range(next_tetromino.tile_matrix.shape[1]):
                 tile = next_tetromino.tile_matrix[row, col]
                 if tile is not None:
-                    # Calculate the position of the tile on the game grid
-                    pos = Point()
-                    pos.x = display_position.x + col
-                    pos.y = display_position.y - row
-                    # Draw the tile
-                    tile.draw(pos)
+                    # Draw the tile at its position next to the game grid
+                    tile.draw_at(display_x + col, display_y - row)
 
     def remove_floating_tetrominos(self):
         temp_score = 0
@@ -231,7 +415,8 @@ class GameGrid:
                 # If a cell is not connected, it's floating
                 if self.tile_matrix[row][col] is not None and (row, col) not in connected:
                     temp_score += self.tile_matrix[row][col].number
-                    self.tile_matrix[row][col] = None
+                    self.set_tile(row, col, None)
+                    self.n_floating_removed += 1
         self.score += temp_score
 
     def dfs(self, row, col, connected):
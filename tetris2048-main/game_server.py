@@ -0,0 +1,271 @@
+################################################################################
+#                                                                              #
+# A server that hosts many headless Tetris 2048 games (sessions) in a single   #
+# asyncio event loop, played over a line protocol on a TCP or Unix socket      #
+#                                                                              #
+################################################################################
+
+import argparse  # used for the command line options
+import asyncio  # used for running all the sessions in a single thread
+import json  # used for encoding the replies with several values
+from headless_game import HeadlessGame, ACTIONS  # the games of the sessions
+from spectator import Broadcaster  # used for streaming the sessions to viewers
+
+# the default time between the automatic falls of a session in milliseconds
+DEFAULT_SPEED = 500
+
+# The line protocol: each line sent by a client is a command and the server
+# replies to each command with a single line ("ERR <message>" on errors).
+#   NEW [seed]      creates a session and attaches the connection to it
+#                   -> OK <session id>
+#   ATTACH <id>     attaches the connection to an existing session -> OK <id>
+#   left, right, down, rotate_cw, rotate_ccw, hard_drop
+#                   applies the action to the attached session
+#                   -> OK 1 (the game has changed) or OK 0
+#   STATE           -> STATE <json: id, tick, score, game_over, board (rows of
+#                      exponents, row 0 is the bottom row), piece (list of
+#                      [row, col, number]), lag (see LAG)>
+#   LAG             -> LAG <json: the tick lag of the attached session>
+#   SESSIONS        -> SESSIONS <json: the tick lag of every session by id>
+#   WATCH <id>      -> OK <id>, then the connection receives the delta-encoded
+#                      stream of the session (see spectator.py), one message
+#                      per tick, starting from the last keyframe, until the
+#                      game is over or the session is closed (the stream ends
+#                      with an end message and the connection is closed)
+#   QUIT            closes the connection -> BYE
+# The sessions created by a connection are closed when the connection closes.
+
+
+# A class for modeling a session: a headless game that falls on its own gravity
+# timer, and the tick lag of this timer (how late the ticks run because the
+# event loop is busy with the other sessions and connections)
+class Session:
+    # A constructor for creating a session with the given id and game that
+    # ticks every speed milliseconds
+    def __init__(self, session_id, game, speed=DEFAULT_SPEED):
+        self.id = session_id
+        self.game = game
+        self.tick_interval = speed / 1000
+        # the lag of the last tick, the maximum lag and the sum of the lags
+        # in seconds
+        self.last_lag, self.max_lag, self.total_lag = 0.0, 0.0, 0.0
+        self.task = None
+        # the broadcaster of the stream of this session (created for the
+        # first spectator)
+        self.broadcaster = None
+
+    # A method for starting the gravity timer of this session
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    # A method for stopping the gravity timer of this session and ending the
+    # stream of its spectators
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.end_stream()
+
+    # A method for sending the end message to the spectators and closing their
+    # connections (see Broadcaster.close)
+    def end_stream(self):
+        if self.broadcaster is not None:
+            self.broadcaster.close(self.game.n_ticks, self.game.game_over)
+
+    # A coroutine that ticks the game on a fixed schedule until it is over
+    # (restarting the schedule instead of ticking repeatedly to catch up, as
+    # the automatic fall in Tetris_2048.start)
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick_interval
+        while not self.game.game_over:
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            now = loop.time()
+            lag = now - next_tick
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+            self.game.tick()
+            if self.broadcaster is not None:
+                self.publish()
+            next_tick += self.tick_interval
+            if next_tick < now:
+                next_tick = now + self.tick_interval
+        # the final state has been published by the last tick
+        self.end_stream()
+
+    # A method for sending the state of the game to the spectators
+    def publish(self):
+        game = self.game
+        piece = [[row, col, number.bit_length() - 1]
+                 for row, col, number in game.get_piece_cells()]
+        self.broadcaster.publish(game.n_ticks, game.grid.exponent_matrix, piece,
+                                 game.grid.score)
+
+    # A method for adding the given stream writer as a spectator (a spectator
+    # of a finished game receives the final state and the end message)
+    def watch(self, writer):
+        if self.broadcaster is None:
+            # the stream starts with a keyframe of the current state
+            self.broadcaster = Broadcaster()
+            self.publish()
+            if self.game.game_over:
+                self.end_stream()
+        self.broadcaster.subscribe(writer)
+
+    # A method that returns the tick lag of this session in milliseconds
+    def get_lag(self):
+        n_ticks = self.game.n_ticks
+        mean_lag = self.total_lag / n_ticks if n_ticks else 0.0
+        return {"last_ms": round(self.last_lag * 1000, 3),
+                "max_ms": round(self.max_lag * 1000, 3),
+                "mean_ms": round(mean_lag * 1000, 3)}
+
+    # A method that returns the state of the game of this session
+    def get_state(self):
+        game = self.game
+        return {"id": self.id, "tick": game.n_ticks, "score": game.grid.score,
+                "game_over": game.game_over,
+                "board": game.grid.get_exponent_matrix().tolist(),
+                "piece": [list(cell) for cell in game.get_piece_cells()],
+                "lag": self.get_lag()}
+
+
+# A class for modeling the server that hosts the sessions
+class GameServer:
+    # A constructor for creating a server whose sessions have grids with the
+    # given dimensions and tick every speed milliseconds
+    def __init__(self, grid_h=20, grid_w=12, speed=DEFAULT_SPEED):
+        self.grid_height, self.grid_width = grid_h, grid_w
+        self.speed = speed
+        self.sessions = {}
+        self.next_session_id = 1
+
+    # A method for creating and starting a session with the given seed
+    def create_session(self, seed=None):
+        game = HeadlessGame(self.grid_height, self.grid_width, seed)
+        session = Session(self.next_session_id, game, self.speed)
+        self.next_session_id += 1
+        self.sessions[session.id] = session
+        session.start()
+        return session
+
+    # A method for stopping and removing the session with the given id
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+
+    # A method that executes the given command line of a client and returns
+    # the reply, the client keeps the attached session and the sessions it
+    # created in the given dictionary
+    def execute(self, line, client):
+        words = line.split()
+        if not words:
+            raise ValueError("empty command")
+        command, args = words[0], words[1:]
+        if command == "NEW":
+            seed = int(args[0]) if args else None
+            session = self.create_session(seed)
+            client["owned"].append(session.id)
+            client["session"] = session
+            return "OK " + str(session.id)
+        if command == "ATTACH":
+            session = self.sessions.get(int(args[0])) if args else None
+            if session is None:
+                raise ValueError("no such session")
+            client["session"] = session
+            return "OK " + str(session.id)
+        if command == "SESSIONS":
+            return "SESSIONS " + json.dumps(
+                {session_id: session.get_lag()
+                 for session_id, session in self.sessions.items()})
+        session = client["session"]
+        if session is None or session.id not in self.sessions:
+            raise ValueError("no session attached")
+        if command in ACTIONS:
+            return "OK " + str(int(session.game.apply_action(command)))
+        if command == "STATE":
+            return "STATE " + json.dumps(session.get_state())
+        if command == "LAG":
+            return "LAG " + json.dumps(session.get_lag())
+        raise ValueError("unknown command: " + command)
+
+    # A coroutine that serves a connected client until it quits or disconnects
+    async def handle_client(self, reader, writer):
+        client = {"session": None, "owned": []}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors="replace").strip()
+                if line == "QUIT":
+                    writer.write(b"BYE\n")
+                    await writer.drain()
+                    break
+                if line.split()[:1] == ["WATCH"]:
+                    await self.stream(line, reader, writer)
+                    break
+                try:
+                    reply = self.execute(line, client)
+                except ValueError as error:
+                    reply = "ERR " + str(error)
+                writer.write(reply.encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session_id in client["owned"]:
+                self.close_session(session_id)
+            writer.close()
+
+    # A coroutine that streams the session given in the WATCH command line to
+    # the client until the stream ends or the client disconnects (the client
+    # does not send any more commands)
+    async def stream(self, line, reader, writer):
+        words = line.split()
+        session = self.sessions.get(int(words[1])) \
+            if len(words) == 2 and words[1].isdigit() else None
+        if session is None:
+            writer.write(b"ERR no such session\n")
+            await writer.drain()
+            return
+        writer.write(("OK " + str(session.id) + "\n").encode())
+        session.watch(writer)
+        try:
+            while await reader.read(1024):
+                pass
+        finally:
+            if session.broadcaster is not None:
+                session.broadcaster.unsubscribe(writer)
+
+    # A coroutine that listens on the given TCP host and port (or on the Unix
+    # socket with the given path) and serves the clients until it is cancelled
+    async def serve(self, host="127.0.0.1", port=8048, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# A function for running the server with the command line options
+def main():
+    parser = argparse.ArgumentParser(description="Tetris 2048 game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8048)
+    parser.add_argument("--unix", help="the path of a Unix socket to listen on")
+    parser.add_argument("--speed", type=int, default=DEFAULT_SPEED,
+                        help="the time between the automatic falls in ms")
+    options = parser.parse_args()
+    server = GameServer(speed=options.speed)
+    try:
+        asyncio.run(server.serve(options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+################################################################################
+#                                                                              #
+# A regression harness that replays a seeded corpus of headless games through #
+# the game rules and compares the results with the stored golden results       #
+#                                                                              #
+################################################################################
+
+import argparse  # used for the command line options
+import json  # used for storing the golden results
+import os  # used for the path of the golden results
+import random  # used for the actions of the games in the corpus
+import struct  # used for the bytes of the checksums
+import sys  # used for the exit status
+import time  # used for timing the games
+import zlib  # used for the checksums
+from concurrent.futures import ProcessPoolExecutor  # used for using all cores
+from headless_game import HeadlessGame, ACTIONS  # the games of the corpus
+
+# the default file of the golden results (placed next to this python code file)
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                           "golden", "replays.json")
+# the default number of games in the corpus (game i has the seed i)
+DEFAULT_N_GAMES = 50
+# the maximum number of ticks of a game in the corpus
+MAX_TICKS = 2000
+# every GREEDY_INTERVAL-th game of the corpus (the seeds 0, 10, 20, ...) is
+# played by the greedy policy of HeadlessGame, which clears lines, as random
+# actions almost never complete a row
+GREEDY_INTERVAL = 10
+
+
+# A function that returns the checksum of the state of the given game after a
+# tick: a CRC-32 of the exponents of the locked tiles, the score and the cells
+# of the active tetromino
+def get_checksum(game):
+    checksum = zlib.crc32(game.grid.get_exponent_matrix().tobytes())
+    checksum = zlib.crc32(struct.pack("<q", game.grid.score), checksum)
+    for row, col, number in game.get_piece_cells():
+        checksum = zlib.crc32(struct.pack("<hhq", row, col, number), checksum)
+    return checksum
+
+
+# A function that plays the game of the corpus with the given seed (the
+# actions come from the greedy policy or from a random number generator seeded
+# with the same seed, see GREEDY_INTERVAL) and returns its final board, score,
+# numbers of cleared lines and removed floating tiles, per-tick checksums (as
+# a string of 8 hex digits per tick) and the time it took in seconds
+def replay_game(seed):
+    start_time = time.perf_counter()
+    game = HeadlessGame(seed=seed)
+    rng = random.Random("actions-%d" % seed)
+    greedy = seed % GREEDY_INTERVAL == 0
+    n_tetrominoes, placement = None, None
+    checksums = []
+    while not game.game_over and game.n_ticks < MAX_TICKS:
+        if greedy:
+            # a placement is chosen when a new tetromino enters the grid and
+            # one action toward it is applied before each tick
+            if game.n_tetrominoes != n_tetrominoes:
+                n_tetrominoes = game.n_tetrominoes
+                placement = game.get_greedy_placement()
+            if placement is not None:
+                game.apply_action(game.get_action_toward(placement))
+        else:
+            for _ in range(rng.randint(0, 2)):
+                game.apply_action(rng.choice(ACTIONS))
+        game.tick()
+        checksums.append("%08x" % get_checksum(game))
+    return {"seed": seed, "score": game.grid.score,
+            "board": game.grid.get_exponent_matrix().tolist(),
+            "lines_cleared": game.grid.n_lines_cleared,
+            "floating_removed": game.grid.n_floating_removed,
+            "checksums": "".join(checksums),
+            "time": time.perf_counter() - start_time}
+
+
+# A function that replays the games with the given seeds in max_workers
+# processes (the number of CPUs by default) and returns their results
+def replay_corpus(seeds, max_workers=None):
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(replay_game, seeds, chunksize=4))
+
+
+# A function that returns None if the given result equals the given golden
+# result, or a message with the first difference
+def compare(golden, result):
+    golden_checksums, checksums = golden["checksums"], result["checksums"]
+    for tick in range(min(len(golden_checksums), len(checksums)) // 8):
+        if golden_checksums[8 * tick:8 * tick + 8] != checksums[8 * tick:8 * tick + 8]:
+            return "game %d differs at tick %d" % (golden["seed"], tick + 1)
+    if len(golden_checksums) != len(checksums):
+        return "game %d has %d ticks instead of %d" % (
+            golden["seed"], len(checksums) // 8, len(golden_checksums) // 8)
+    if golden["score"] != result["score"]:
+        return "game %d has the score %d instead of %d" % (
+            golden["seed"], result["score"], golden["score"])
+    if golden["board"] != result["board"]:
+        return "game %d has a different final board" % golden["seed"]
+    for key in ("lines_cleared", "floating_removed"):
+        if golden[key] != result[key]:
+            return "game %d has %s = %d instead of %d" % (
+                golden["seed"], key, result[key], golden[key])
+    return None
+
+
+# A function that returns the list of the rules that the games with the given
+# results never exercise (empty if the corpus exercises them all)
+def get_coverage_gaps(results):
+    gaps = []
+    if sum(result["lines_cleared"] for result in results) == 0:
+        gaps.append("the corpus clears no lines")
+    if sum(result["floating_removed"] for result in results) == 0:
+        gaps.append("the corpus removes no floating tiles")
+    return gaps
+
+
+# A function for printing the time per game of the given results
+def report_times(results, wall_time):
+    times = sorted(result["time"] for result in results)
+    n_ticks = sum(len(result["checksums"]) // 8 for result in results)
+    print("%d games (%d ticks) in %.2f s: %.2f ms per game (median %.2f ms, "
+          "max %.2f ms)" % (len(results), n_ticks, wall_time,
+                            1000 * sum(times) / len(times),
+                            1000 * times[len(times) // 2], 1000 * times[-1]))
+
+
+# A function for replaying the corpus and storing the results as the golden
+# results in the given file
+def record(path=GOLDEN_PATH, n_games=DEFAULT_N_GAMES, max_workers=None):
+    start_time = time.perf_counter()
+    results = replay_corpus(range(n_games), max_workers)
+    report_times(results, time.perf_counter() - start_time)
+    for result in results:
+        del result["time"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"max_ticks": MAX_TICKS, "games": results}, file)
+        file.write("\n")
+
+
+# A function for replaying the corpus of the golden results in the given file
+# and returning the list of the differences and the rules the corpus does not
+# exercise (empty if there are none)
+def check(path=GOLDEN_PATH, max_workers=None):
+    with open(path) as file:
+        goldens = json.load(file)
+    if goldens["max_ticks"] != MAX_TICKS:
+        return ["the golden results have another maximum number of ticks"]
+    start_time = time.perf_counter()
+    results = replay_corpus([golden["seed"] for golden in goldens["games"]],
+                            max_workers)
+    report_times(results, time.perf_counter() - start_time)
+    differences = [compare(golden, result)
+                   for golden, result in zip(goldens["games"], results)]
+    return [difference for difference in differences
+            if difference is not None] + get_coverage_gaps(results)
+
+
+# A function for recording or checking the golden results from the command line
+def main():
+    parser = argparse.ArgumentParser(description="Tetris 2048 golden replays")
+    parser.add_argument("command", choices=["check", "record"])
+    parser.add_argument("--goldens", default=GOLDEN_PATH)
+    parser.add_argument("--games", type=int, default=DEFAULT_N_GAMES,
+                        help="the number of games recorded")
+    parser.add_argument("--workers", type=int, default=None)
+    options = parser.parse_args()
+    if options.command == "record":
+        record(options.goldens, options.games, options.workers)
+        return
+    differences = check(options.goldens, options.workers)
+    for difference in differences:
+        print(difference)
+    print("FAILED" if differences else "OK")
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import random  # used for the random numbers of a game
+from game_grid import GameGrid  # the class for modeling the game grid
+from tetromino import Tetromino  # the class for modeling the tetrominoes
+from tetromino import TETROMINO_TYPES  # the types chosen by create_tetromino
+# used for evaluating the placements of the active tetromino
+from simulation import from_grid, get_afterstates
+
+# the actions that can be applied to the active tetromino of a game
+ACTIONS = ["left", "right", "down", "rotate_cw", "rotate_ccw", "hard_drop"]
+
+
+# A class for modeling a game that is played without a window, e.g. by a bot
+# or a remote player (see game_server.py). It uses the same GameGrid and
+# Tetromino rules as the start function of Tetris_2048.py, but the time is
+# given by calling tick (one automatic fall of the active tetromino) instead of
+# a clock, and the random numbers of each tetromino come from a random number
+# generator seeded with the seed of the game and the index of the tetromino,
+# so the same seed and the same actions always give the same game, and a game
+# can be continued from a saved state without the state of a generator. (The
+# grid dimensions are class variables of Tetromino, so all the games of a
+# process must have the same grid dimensions.)
+class HeadlessGame:
+    # A constructor for creating a game on a grid with the given dimensions
+    def __init__(self, grid_h=20, grid_w=12, seed=None):
+        Tetromino.grid_height = grid_h
+        Tetromino.grid_width = grid_w
+        # a random seed is chosen when no seed is given
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.grid = GameGrid(grid_h, grid_w)
+        # the number of ticks and the number of tetrominoes that have entered
+        # the game grid so far
+        self.n_ticks = 0
+        self.n_tetrominoes = 1
+        self.current_tetromino = self.create_tetromino(0)
+        self.next_tetromino = self.create_tetromino(1)
+        self.grid.current_tetromino = self.current_tetromino
+        self.grid.next_tetromino = self.next_tetromino
+        self.game_over = False
+
+    # A method for creating the random shaped tetromino with the given index
+    # (0 for the first tetromino of the game) to enter the game grid
+    def create_tetromino(self, index):
+        rng = random.Random("%d-%d" % (self.seed, index))
+        return Tetromino(rng.choice(TETROMINO_TYPES), rng)
+
+    # A method for applying the given action (see ACTIONS) to the active
+    # tetromino, returns True if the action has changed the game
+    def apply_action(self, action):
+        if action not in ACTIONS:
+            raise ValueError("unknown action: " + str(action))
+        if self.game_over:
+            return False
+        if action == "rotate_cw":
+            return self.current_tetromino.rotate_cw(self.grid)
+        if action == "rotate_ccw":
+            return self.current_tetromino.rotate_ccw(self.grid)
+        if action == "hard_drop":
+            # the dropped tetromino is locked without waiting for the next tick
+            self.current_tetromino.hard_drop(self.grid)
+            self.lock()
+            return True
+        return self.current_tetromino.move(action, self.grid)
+
+    # A method for moving the active tetromino down by one (automatic fall)
+    # and locking it when it cannot go down anymore
+    def tick(self):
+        if self.game_over:
+            return
+        self.n_ticks += 1
+        if not self.current_tetromino.move("down", self.grid):
+            self.lock()
+
+    # A method for locking the active tetromino and creating the next one
+    def lock(self):
+        if self.grid.lock_tetromino(self.current_tetromino):
+            self.game_over = True
+            return
+        self.current_tetromino = self.next_tetromino
+        self.grid.current_tetromino = self.current_tetromino
+        self.next_tetromino = self.create_tetromino(self.n_tetrominoes + 1)
+        self.grid.next_tetromino = self.next_tetromino
+        self.n_tetrominoes += 1
+
+    # A method that returns the cells of the active tetromino inside the grid
+    # as a list of (row, col, number) tuples
+    def get_piece_cells(self):
+        tetromino = self.current_tetromino
+        return [(y, x, tetromino.tile_matrix[row][col].number)
+                for row, col, x, y in tetromino.get_cell_positions()
+                if y < self.grid.grid_height]
+
+    # A method that returns the placement of the active tetromino with the
+    # highest score delta that does not end the game (the lowest one for the
+    # equal deltas), or None if the tetromino has no placement. (A greedy
+    # policy that merges the tiles and clears the lines when it can.)
+    def get_greedy_placement(self):
+        afterstates = get_afterstates(from_grid(self.grid),
+                                      self.current_tetromino.get_rotation_states())
+        if not afterstates:
+            return None
+        return max(afterstates, key=lambda afterstate: (
+            not afterstate[3], afterstate[2], -afterstate[0].row))[0]
+
+    # A method that returns the action that moves the active tetromino toward
+    # the given placement (see get_greedy_placement): first the rotation, then
+    # the column and then a hard drop. The rotations fail until the tetromino
+    # is inside the grid, so one action is applied before each tick.
+    def get_action_toward(self, placement):
+        tetromino = self.current_tetromino
+        for rotation, cells in tetromino.get_rotation_states():
+            if cells == placement.cells:
+                break
+        else:
+            return "hard_drop"
+        if rotation != 0:
+            return "rotate_ccw" if rotation == 3 else "rotate_cw"
+        min_col = tetromino.shape_info.rotations[tetromino.rotation].bbox[2]
+        left_x = tetromino.bottom_left_cell.x + min_col
+        if left_x < placement.col:
+            return "right"
+        if left_x > placement.col:
+            return "left"
+        return "hard_drop"
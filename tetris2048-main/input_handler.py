@@ -0,0 +1,52 @@
+import time  # used for timing the auto-repeat of the held keys
+
+import lib.stddraw as stddraw  # used for reading the queued key events
+
+
+# A class for turning the key presses and releases queued by stddraw into game
+# actions, applying delayed auto-shift (DAS) and auto-repeat rate (ARR) to the
+# movement keys while they are held down
+class InputHandler:
+    # the keys that repeat while they are held down (other keys act once)
+    repeatable_keys = ("left", "right", "down")
+
+    # A constructor for creating an input handler with the given delay before
+    # the first repeat (das) and period between repeats (arr) in milliseconds
+    def __init__(self, das=170, arr=50):
+        self.das = das / 1000
+        self.arr = arr / 1000
+        # the time of the next repeat for each held repeatable key
+        self.next_repeat = {}
+
+    # A method that returns the list of keys to act on since the last call,
+    # in the order the presses (and the repeats) happened
+    def get_actions(self, now=None):
+        actions = []
+        # every queued press is an action, so no input is lost when several
+        # keys arrive within the same frame
+        while stddraw.hasNextKeyEvent():
+            timestamp, key, pressed = stddraw.nextKeyEvent()
+            if pressed:
+                actions.append(key)
+                if key in InputHandler.repeatable_keys:
+                    self.next_repeat[key] = timestamp + self.das
+            else:
+                self.next_repeat.pop(key, None)
+        # add the repeats of the keys that are still held down
+        if now is None:
+            now = time.perf_counter()
+        for key in list(self.next_repeat):
+            # a release may have been discarded (e.g. while a menu was open)
+            if not stddraw.isKeyDown(key):
+                del self.next_repeat[key]
+                continue
+            while self.next_repeat[key] <= now:
+                actions.append(key)
+                self.next_repeat[key] += self.arr
+        return actions
+
+    # A method for discarding the queued key events and the held key states
+    # (e.g. after returning from a menu)
+    def reset(self):
+        stddraw.clearKeyEvents()
+        self.next_repeat.clear()
@@ -0,0 +1,149 @@
+import logging  # used for reporting the results that cannot be written
+import os  # used for the default path of the database
+import queue  # used for passing the results to the writer thread
+import sqlite3  # used for storing the results
+import threading  # used for writing the results in the background
+import time  # used for the times of the results
+
+# the default database file (placed next to this python code file)
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                "leaderboard.db")
+# the number of top scores of each difficulty kept in memory
+DEFAULT_TOP_N = 10
+# the maximum number of results written in a single transaction and the time
+# in seconds the writer waits for more results before writing a batch
+_BATCH_SIZE = 1000
+_FLUSH_INTERVAL = 0.5
+
+_logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    highest_number INTEGER,
+    n_tetrominoes INTEGER,
+    duration REAL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_difficulty_and_score
+    ON games (difficulty, score DESC);
+"""
+
+
+# A function that opens a connection to the given database file in the WAL
+# mode, where a commit appends to the write-ahead log and the log is synced to
+# the disk only at checkpoints (synchronous=NORMAL), so the database stays
+# consistent after a crash without an fsync for every game
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# A class for modeling the leaderboard and the history of the finished games.
+# The results given to record are inserted in batches by a background writer
+# thread, so recording a result never waits for the disk, and the top scores
+# of each difficulty are kept in memory, so the menus show them without a
+# query. The results that are not written yet are written by flush and close.
+class Leaderboard:
+    # A constructor for opening (or creating) the leaderboard in the given
+    # database file and keeping the top_n scores of each difficulty in memory
+    def __init__(self, path=DEFAULT_DATABASE, top_n=DEFAULT_TOP_N):
+        self.path = path
+        self.top_n = top_n
+        # the connection used for the queries (the writer has its own)
+        self.connection = connect(path)
+        self.connection.executescript(_SCHEMA)
+        # the top scores of each difficulty as lists of (score, highest
+        # number, finished at) tuples sorted by decreasing score
+        self.top_scores = {}
+        for (difficulty,) in self.connection.execute(
+                "SELECT DISTINCT difficulty FROM games"):
+            self.top_scores[difficulty] = self.query_top_scores(difficulty, top_n)
+        self.queue = queue.Queue()
+        self.n_written = 0
+        self.writer = threading.Thread(target=self.write_results, daemon=True)
+        self.writer.start()
+
+    # A method for recording the result of a finished game
+    def record(self, difficulty, score, highest_number=None, n_tetrominoes=None,
+               duration=None):
+        finished_at = time.time()
+        self.queue.put((difficulty, score, highest_number, n_tetrominoes,
+                        duration, finished_at))
+        # update the top scores in memory without waiting for the writer
+        top_scores = self.top_scores.setdefault(difficulty, [])
+        if len(top_scores) < self.top_n or score > top_scores[-1][0]:
+            top_scores.append((score, highest_number, finished_at))
+            top_scores.sort(key=lambda result: -result[0])
+            del top_scores[self.top_n:]
+
+    # A method that returns the n (top_n by default) highest scores of the
+    # given difficulty as (score, highest number, finished at) tuples, from the
+    # memory when possible
+    def get_top_scores(self, difficulty, n=None):
+        if n is None or n <= self.top_n:
+            return self.top_scores.get(difficulty, [])[:n]
+        self.flush()
+        return self.query_top_scores(difficulty, n)
+
+    # A method that returns the n highest scores of the given difficulty from
+    # the database (using the index on the difficulty and the score)
+    def query_top_scores(self, difficulty, n):
+        return self.connection.execute(
+            "SELECT score, highest_number, finished_at FROM games "
+            "WHERE difficulty = ? ORDER BY score DESC LIMIT ?",
+            (difficulty, n)).fetchall()
+
+    # A method that waits until all the recorded results are written (or
+    # until the writer thread has stopped, so that a writer that has died
+    # cannot block the caller forever as queue.join would)
+    def flush(self):
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and self.writer.is_alive():
+                self.queue.all_tasks_done.wait(_FLUSH_INTERVAL)
+
+    # A method for writing the remaining results and closing the leaderboard
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+        self.connection.close()
+
+    # A method that inserts the recorded results in batches until close is
+    # called (this runs in the writer thread). A batch that cannot be written
+    # (e.g. because of a database error) is logged and dropped, and the writer
+    # goes on with the next batch.
+    def write_results(self):
+        connection = connect(self.path)
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            # collect the results that arrive within the flush interval
+            deadline = time.perf_counter() + _FLUSH_INTERVAL
+            while batch[-1] is not None and len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(
+                        timeout=max(0, deadline - time.perf_counter())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            try:
+                if batch:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO games (difficulty, score, "
+                            "highest_number, n_tetrominoes, duration, "
+                            "finished_at) VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    self.n_written += len(batch)
+            except Exception:
+                _logger.exception("cannot write %d results to %s",
+                                  len(batch), self.path)
+            finally:
+                for _ in range(len(batch) + closing):
+                    self.queue.task_done()
+        connection.close()
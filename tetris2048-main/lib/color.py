@@ -9,9 +9,13 @@ objects.
 
 class Color:
     """
-    A Color object models an RGB color.
+    A Color object models an RGB color. Color objects are immutable
+    values (equal colors have equal hash values), so a single Color
+    object can be shared by all the code that uses the same color.
     """
 
+    __slots__ = ('_r', '_g', '_b')
+
     #-------------------------------------------------------------------
 
     def __init__(self, r=0, g=0, b=0):
@@ -19,9 +23,60 @@ class Color:
         Construct self such that it has the given red (r),
         green (g), and blue (b) components.
         """
-        self._r = r  # Red component
-        self._g = g  # Green component
-        self._b = b  # Blue component
+        object.__setattr__(self, '_r', r)  # Red component
+        object.__setattr__(self, '_g', g)  # Green component
+        object.__setattr__(self, '_b', b)  # Blue component
+
+    #-------------------------------------------------------------------
+
+    def __setattr__(self, name, value):
+        """
+        Raise an AttributeError, as the components of self cannot be
+        changed.
+        """
+        raise AttributeError('Color objects are immutable')
+
+    #-------------------------------------------------------------------
+
+    def __eq__(self, other):
+        """
+        Return True if other is a Color with the same components.
+        """
+        if not isinstance(other, Color):
+            return NotImplemented
+        return (self._r, self._g, self._b) == (other._r, other._g, other._b)
+
+    #-------------------------------------------------------------------
+
+    def __hash__(self):
+        """
+        Return the hash value of self.
+        """
+        return hash((self._r, self._g, self._b))
+
+    #-------------------------------------------------------------------
+
+    def __reduce__(self):
+        """
+        Return the arguments for recreating self (used for pickling).
+        """
+        return (Color, (self._r, self._g, self._b))
+
+    #-------------------------------------------------------------------
+
+    def __copy__(self):
+        """
+        Return self, as a copy of an immutable object is not needed.
+        """
+        return self
+
+    #-------------------------------------------------------------------
+
+    def __deepcopy__(self, memo):
+        """
+        Return self, as a copy of an immutable object is not needed.
+        """
+        return self
 
     #-------------------------------------------------------------------
 
@@ -0,0 +1,183 @@
+"""
+recorder.py
+
+The recorder module defines the Recorder class, which saves the frames
+shown in the stddraw window as an animated GIF or as a sequence of PNG
+files without slowing down the program that draws them.
+"""
+
+#-----------------------------------------------------------------------
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+import pygame
+
+#-----------------------------------------------------------------------
+
+_DEFAULT_MAX_QUEUE = 64
+
+#-----------------------------------------------------------------------
+
+class Recorder:
+    """
+    A Recorder object copies the frames given to addFrame() into a
+    bounded queue, and a background thread encodes the queued frames.
+    When the queue is more than half full, the frames are downsampled
+    to half size before being queued, and when it is full, the frames
+    are dropped, so addFrame() never waits for the encoder. The frames
+    of a GIF are saved as PNG files in a temporary directory and
+    encoded into the GIF by close(), so no frames are kept in memory
+    while recording. All the frames of a GIF have the size of its
+    first frame: the encoder scales the downsampled frames back to
+    this size (only the PNG files keep the downsampled size).
+    """
+
+    #-------------------------------------------------------------------
+
+    def __init__(self, f, scale=1.0, maxQueue=_DEFAULT_MAX_QUEUE):
+        """
+        Construct self to record to f: an animated GIF if f ends with
+        '.gif' (this needs the Pillow package), and otherwise a
+        directory of numbered PNG files. The frames are scaled by scale
+        before being queued, and at most maxQueue frames wait for the
+        encoder.
+        """
+        self._fileName = f
+        self._scale = scale
+        self._gif = f.lower().endswith('.gif')
+        if self._gif:
+            from PIL import Image  # only needed for GIF files
+            self._frameDir = tempfile.mkdtemp(prefix='recorder')
+            self._gifDurations = []
+            # The size of all the frames, set by the first frame.
+            self._gifSize = None
+        else:
+            self._frameDir = f
+            os.makedirs(f, exist_ok=True)
+        self._queue = queue.Queue(maxQueue)
+        self._maxQueue = maxQueue
+        self._framesAdded = 0
+        self._framesDropped = 0
+        self._framesWritten = 0
+        self._lastTime = None
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    #-------------------------------------------------------------------
+
+    def addFrame(self, surface):
+        """
+        Copy surface, an object of type pygame.Surface, into the queue
+        of frames to be encoded, or drop it if the queue is full.
+        """
+        now = time.perf_counter()
+        if self._lastTime is None:
+            self._lastTime = now
+        elapsed = now - self._lastTime
+        self._lastTime = now
+        self._framesAdded += 1
+        pending = self._queue.qsize()
+        if pending >= self._maxQueue:
+            self._framesDropped += 1
+            return
+        scale = self._scale
+        if self._gif and self._gifSize is None:
+            self._gifSize = (max(1, int(surface.get_width() * scale)),
+                             max(1, int(surface.get_height() * scale)))
+        if pending > self._maxQueue // 2:
+            scale /= 2.0
+        if scale != 1.0:
+            w = max(1, int(surface.get_width() * scale))
+            h = max(1, int(surface.get_height() * scale))
+            surface = pygame.transform.scale(surface, (w, h))
+        # The pixels are copied, so the surface can be drawn on again
+        # while the frame waits in the queue.
+        data = pygame.image.tostring(surface, 'RGB')
+        try:
+            self._queue.put_nowait((data, surface.get_size(), elapsed))
+        except queue.Full:
+            self._framesDropped += 1
+
+    #-------------------------------------------------------------------
+
+    def close(self):
+        """
+        Wait until all the queued frames are encoded, and finish the
+        recording.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if not self._gif:
+            return
+        try:
+            if self._framesWritten > 0:
+                frames = self._readGifFrames()
+                # The first duration is the time before the first frame.
+                durations = self._gifDurations[1:] + self._gifDurations[-1:]
+                next(frames).save(
+                    self._fileName, save_all=True, append_images=frames,
+                    duration=[max(20, int(d * 1000)) for d in durations],
+                    loop=0)
+        finally:
+            shutil.rmtree(self._frameDir, ignore_errors=True)
+
+    #-------------------------------------------------------------------
+
+    def framesWritten(self):
+        """
+        Return the number of frames encoded so far.
+        """
+        return self._framesWritten
+
+    #-------------------------------------------------------------------
+
+    def framesDropped(self):
+        """
+        Return the number of frames dropped because the queue was full.
+        """
+        return self._framesDropped
+
+    #-------------------------------------------------------------------
+
+    def _frameFileName(self, i):
+        """
+        Return the name of the PNG file of the i-th encoded frame.
+        """
+        return os.path.join(self._frameDir, 'frame%06d.png' % i)
+
+    #-------------------------------------------------------------------
+
+    def _readGifFrames(self):
+        """
+        Yield the saved frames one at a time in the palette mode of GIF.
+        """
+        from PIL import Image
+        for i in range(self._framesWritten):
+            with Image.open(self._frameFileName(i)) as image:
+                yield image.quantize()
+
+    #-------------------------------------------------------------------
+
+    def _encode(self):
+        """
+        Encode the queued frames until close() is called. This runs in
+        the background thread.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            data, size, elapsed = item
+            frame = pygame.image.frombuffer(data, size, 'RGB')
+            if self._gif and size != self._gifSize:
+                frame = pygame.transform.scale(frame, self._gifSize)
+            pygame.image.save(frame, self._frameFileName(self._framesWritten))
+            if self._gif:
+                self._gifDurations.append(elapsed)
+            self._framesWritten += 1
@@ -10,6 +10,7 @@ commonly used Color objects defined in the color module.
 import time
 import os
 import sys
+import collections
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
 import pygame
@@ -62,6 +63,13 @@ _DEFAULT_PEN_COLOR = BLACK
 _DEFAULT_FONT_FAMILY = 'Helvetica'
 _DEFAULT_FONT_SIZE = 12
 
+# The default number of frames per second for showFrame()
+_DEFAULT_FRAME_RATE = 60
+
+# The maximum number of keys (and key events) kept in the queues. When a
+# queue is full, its oldest entry is discarded.
+_KEY_QUEUE_SIZE = 64
+
 _xmin = None
 _ymin = None
 _xmax = None
@@ -74,11 +82,23 @@ _canvasWidth = float(_DEFAULT_CANVAS_SIZE)
 _canvasHeight = float(_DEFAULT_CANVAS_SIZE)
 _penRadius = None
 _penColor = _DEFAULT_PEN_COLOR
-_keysTyped = []
+_keysTyped = collections.deque(maxlen=_KEY_QUEUE_SIZE)
+# (timestamp, key, pressed) tuples for the key presses and releases
+_keyEvents = collections.deque(maxlen=_KEY_QUEUE_SIZE)
+# The keys that are currently held down
+_keysDown = set()
 
 # Has the window been created?
 _windowCreated = False
 
+# The recorder.Recorder object that receives the shown frames, if any
+_recorder = None
+
+# The time.perf_counter() value at which the current frame of showFrame()
+# ends, and the number of frame deadlines missed so far
+_frameDeadline = None
+_missedFrames = 0
+
 #-----------------------------------------------------------------------
 # Begin added by Alan J. Broder
 #-----------------------------------------------------------------------
@@ -98,15 +118,23 @@ _mousePos = None
 
 #-----------------------------------------------------------------------
 
+# The pygame.Color objects of the color.Color objects (created once for
+# each color, as Color objects are immutable values).
+_pygameColors = {}
+
 def _pygameColor(c):
     """
     Convert c, an object of type color.Color, to an equivalent object
     of type pygame.Color.  Return the result.
     """
-    r = c.getRed()
-    g = c.getGreen()
-    b = c.getBlue()
-    return pygame.Color(r, g, b)
+    pygameColor = _pygameColors.get(c)
+    if pygameColor is None:
+        r = c.getRed()
+        g = c.getGreen()
+        b = c.getBlue()
+        pygameColor = pygame.Color(r, g, b)
+        _pygameColors[c] = pygameColor
+    return pygameColor
 
 
 #-----------------------------------------------------------------------
@@ -539,6 +567,63 @@ def picture(pic, x=None, y=None):
     _surface.blit(picSurface, [xs - ws / 2.0, ys - hs / 2.0, ws, hs])
 
 
+def blit(surface, x, y):
+    """
+    Draw surface, an object of type pygame.Surface, on the background
+    canvas such that its lower left corner is at (x, y). The surface is
+    drawn at its own size in pixels (see pixelSize()).
+    """
+    _makeSureWindowCreated()
+    xs = _scaleX(float(x))
+    ys = _scaleY(float(y))
+    _surface.blit(surface, (int(round(xs)), int(round(ys)) - surface.get_height()))
+
+
+def pixelSize(w, h):
+    """
+    Return the size (width, height) in whole pixels of a w by h area
+    of the user coordinate system.
+    """
+    return int(round(_factorX(float(w)))), int(round(_factorY(float(h))))
+
+
+def penRadiusPixels(r):
+    """
+    Return the width in whole pixels (at least 1) of the lines drawn
+    with the pen radius r (see setPenRadius).
+    """
+    return max(1, int(round(float(r) * float(_DEFAULT_CANVAS_SIZE))))
+
+
+def pixels(w=None, h=None):
+    """
+    Return the background canvas as a numpy array of shape (h, w, 3)
+    with the RGB values of the pixels, the top row first. The array is
+    a view of the canvas, not a copy, so the canvas is locked (and
+    cannot be drawn on) until the array is deleted. If w and h are
+    given, the canvas is downsampled to w by h pixels by taking evenly
+    spaced pixels: the result is still a view when the canvas size is
+    a multiple of (w, h), and a copy otherwise. w and h default to the
+    canvas size.
+    """
+    import pygame.surfarray
+    _makeSureWindowCreated()
+    view = pygame.surfarray.pixels3d(_surface).transpose(1, 0, 2)
+    if w is None and h is None:
+        return view
+    canvasH, canvasW = view.shape[0], view.shape[1]
+    if w is None:
+        w = canvasW
+    if h is None:
+        h = canvasH
+    if (canvasW % w == 0) and (canvasH % h == 0):
+        return view[::canvasH // h, ::canvasW // w]
+    import numpy
+    rows = numpy.arange(h) * canvasH // h
+    cols = numpy.arange(w) * canvasW // w
+    return view[numpy.ix_(rows, cols)]
+
+
 def clear(c=WHITE):
     """
     Clear the background canvas to color c, where c is an
@@ -575,6 +660,8 @@ def _show():
     """
     _background.blit(_surface, (0, 0))
     pygame.display.flip()
+    if _recorder is not None:
+        _recorder.addFrame(_surface)
     _checkForEvents()
 
 
@@ -617,6 +704,110 @@ def show(msec=float('inf')):
         _checkForEvents()
 
 
+def showFrame(fps=_DEFAULT_FRAME_RATE):
+    """
+    Copy the background canvas to the window canvas, and then wait
+    until the end of the current frame of a schedule with fps frames
+    per second. The frame deadlines are computed from a monotonic
+    clock, so the time spent on drawing a frame is subtracted from the
+    wait and the waiting error does not build up. If the drawing took
+    longer than a frame, the missed deadlines are skipped (and counted,
+    see missedFrames()) instead of being caught up. Events are
+    processed while waiting.
+    """
+    global _frameDeadline
+    global _missedFrames
+    _makeSureWindowCreated()
+    _show()
+    period = 1.0 / fps
+    now = time.perf_counter()
+    if _frameDeadline is None:
+        _frameDeadline = now
+    _frameDeadline += period
+    if now > _frameDeadline:
+        missed = int((now - _frameDeadline) / period) + 1
+        _missedFrames += missed
+        _frameDeadline += missed * period
+    _waitUntil(_frameDeadline)
+
+
+def _waitUntil(deadline):
+    """
+    Wait until time.perf_counter() reaches deadline while processing
+    the events that arrive in the meantime.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0.0:
+            return
+        # pygame waits with a millisecond resolution (and may oversleep
+        # a little), so the last 2 ms are spent yielding the CPU instead.
+        if remaining > 0.002:
+            waitForEvent((remaining - 0.001) * 1000.0)
+        else:
+            time.sleep(0)
+
+
+def missedFrames():
+    """
+    Return the number of frame deadlines missed by showFrame() since
+    the last call of resetFrameClock().
+    """
+    return _missedFrames
+
+
+def resetFrameClock():
+    """
+    Restart the frame schedule of showFrame() from the current time and
+    set the missed frame count to 0. Call this function after a pause
+    (e.g. a menu) so that the pause is not counted as missed frames.
+    """
+    global _frameDeadline
+    global _missedFrames
+    _frameDeadline = None
+    _missedFrames = 0
+
+
+#-----------------------------------------------------------------------
+
+def startRecording(f, scale=1.0):
+    """
+    Start recording the frames shown in the window to f: an animated
+    GIF if f ends with '.gif' (this needs the Pillow package), and
+    otherwise a directory of numbered PNG files. The frames are scaled
+    by scale. They are encoded by a background thread, so show() does
+    not wait for the encoding; frames are downsampled or dropped when
+    the encoder falls behind.
+    """
+    global _recorder
+    from lib.recorder import Recorder
+    stopRecording()
+    _recorder = Recorder(f, scale)
+
+
+def stopRecording():
+    """
+    Stop recording the shown frames, and wait until the recorded
+    frames are saved. Return the number of saved frames (0 if nothing
+    was being recorded).
+    """
+    global _recorder
+    if _recorder is None:
+        return 0
+    recorder = _recorder
+    _recorder = None
+    recorder.close()
+    return recorder.framesWritten()
+
+
+def isRecording():
+    """
+    Return True if the shown frames are being recorded, and False
+    otherwise.
+    """
+    return _recorder is not None
+
+
 #-----------------------------------------------------------------------
 
 def _saveToFile():
@@ -665,8 +856,18 @@ def _checkForEvents():
     Check if any new event has occured (such as a key typed or button
     pressed).  If a key has been typed, then put that key in a queue.
     """
+    _makeSureWindowCreated()
+
+    for event in pygame.event.get():
+        _handleEvent(event)
+
+
+def _handleEvent(event):
+    """
+    Update the keyboard and mouse state according to a single pygame
+    event.
+    """
     global _surface
-    global _keysTyped
 
     #-------------------------------------------------------------------
     # Begin added by Alan J. Broder
@@ -677,29 +878,61 @@ def _checkForEvents():
     # End added by Alan J. Broder
     #-------------------------------------------------------------------
 
-    _makeSureWindowCreated()
+    if event.type == pygame.QUIT:
+        sys.exit()
+    elif event.type == pygame.KEYDOWN:
+        key = pygame.key.name(event.key)
+        _keysTyped.append(key)
+        _keyEvents.append((time.perf_counter(), key, True))
+        _keysDown.add(key)
+    elif event.type == pygame.KEYUP:
+        key = pygame.key.name(event.key)
+        _keyEvents.append((time.perf_counter(), key, False))
+        _keysDown.discard(key)
+    elif (event.type == pygame.MOUSEBUTTONUP) and \
+            (event.button == 3):
+        _saveToFile()
+
+    #---------------------------------------------------------------
+    # Begin added by Alan J. Broder
+    #---------------------------------------------------------------
+    # Every time the mouse button is pressed, remember
+    # the mouse position as of that press.
+    elif (event.type == pygame.MOUSEBUTTONDOWN) and \
+            (event.button == 1):
+        _mousePressed = True
+        _mousePos = event.pos
+        #---------------------------------------------------------------
+    # End added by Alan J. Broder
+    #---------------------------------------------------------------
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
-        elif event.type == pygame.KEYDOWN:
-            _keysTyped = [pygame.key.name(event.key)] + _keysTyped
-        elif (event.type == pygame.MOUSEBUTTONUP) and \
-                (event.button == 3):
-            _saveToFile()
+    # The window contents may have been lost (e.g. after being covered
+    # or restored), so copy the background canvas again.
+    elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+        _background.blit(_surface, (0, 0))
+        pygame.display.flip()
 
-        #---------------------------------------------------------------
-        # Begin added by Alan J. Broder
-        #---------------------------------------------------------------
-        # Every time the mouse button is pressed, remember
-        # the mouse position as of that press.
-        elif (event.type == pygame.MOUSEBUTTONDOWN) and \
-                (event.button == 1):
-            _mousePressed = True
-            _mousePos = event.pos
-            #---------------------------------------------------------------
-        # End added by Alan J. Broder
-        #---------------------------------------------------------------
+
+def waitForEvent(msec=None):
+    """
+    Block until the user interacts with the window (a key typed, a
+    mouse click, ...) or until msec milliseconds have passed, and then
+    process all pending events.  msec defaults to None, which means
+    waiting without a time limit.  Unlike show(), this function neither
+    copies the background canvas to the window canvas nor polls, so an
+    idle window uses (almost) no CPU time.  Return True if an event
+    was received, and False if the time limit expired.
+    """
+    _makeSureWindowCreated()
+    if msec is None:
+        event = pygame.event.wait()
+    else:
+        event = pygame.event.wait(max(int(msec), 1))
+    if event.type == pygame.NOEVENT:
+        return False
+    _handleEvent(event)
+    _checkForEvents()
+    return True
 
 
 #-----------------------------------------------------------------------
@@ -711,8 +944,7 @@ def hasNextKeyTyped():
     Return True if the queue of the keys the user typed is not empty.
     Otherwise return False.
     """
-    global _keysTyped
-    return _keysTyped != []
+    return len(_keysTyped) != 0
 
 
 def nextKeyTyped():
@@ -720,16 +952,47 @@ def nextKeyTyped():
     Remove the first key from the queue of the keys that the user typed,
     and return that key.
     """
-    global _keysTyped
-    return _keysTyped.pop()
+    return _keysTyped.popleft()
 
 
 def clearKeysTyped():
     """
     Clear all the keys in the queue of the keys that the user typed.
     """
-    global _keysTyped
-    _keysTyped = []
+    _keysTyped.clear()
+
+
+def hasNextKeyEvent():
+    """
+    Return True if the queue of the key presses and releases is not
+    empty. Otherwise return False.
+    """
+    return len(_keyEvents) != 0
+
+
+def nextKeyEvent():
+    """
+    Remove the oldest event from the queue of the key presses and
+    releases, and return it as a (timestamp, key, pressed) tuple.
+    timestamp is the time.perf_counter() value at which the event was
+    received, and pressed is True for a press and False for a release.
+    """
+    return _keyEvents.popleft()
+
+
+def clearKeyEvents():
+    """
+    Clear all the events in the queue of the key presses and releases.
+    """
+    _keyEvents.clear()
+
+
+def isKeyDown(key):
+    """
+    Return True if the given key (e.g. 'left' or 'space') is currently
+    held down, and False otherwise.
+    """
+    return key in _keysDown
 
 
 #-----------------------------------------------------------------------
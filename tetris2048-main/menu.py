@@ -0,0 +1,77 @@
+import lib.stddraw as stddraw  # used for drawing the buttons and waiting for clicks
+from lib.color import Color  # used for coloring the menus
+
+# the colors shared by all the menus of the game
+BACKGROUND_COLOR = Color(42, 69, 99)
+BUTTON_COLOR = Color(25, 255, 228)
+TEXT_COLOR = Color(31, 160, 239)
+
+
+# A class for modeling a clickable rectangular button with a text label
+class Button:
+    # A constructor for creating a button with the given bottom left corner,
+    # dimensions and label (the label may be None for a box without text)
+    def __init__(self, blc_x, blc_y, width, height, label=None, font_size=25,
+                 value=None):
+        self.blc_x, self.blc_y = blc_x, blc_y
+        self.width, self.height = width, height
+        self.label = label
+        self.font_size = font_size
+        # the value returned by wait_for_button when this button is clicked
+        self.value = label if value is None else value
+
+    # A method for drawing this button as a filled rectangle with its label
+    def draw(self):
+        stddraw.setPenColor(BUTTON_COLOR)
+        stddraw.filledRectangle(self.blc_x, self.blc_y, self.width, self.height)
+        if self.label is not None:
+            stddraw.setFontFamily("Arial")
+            stddraw.setFontSize(self.font_size)
+            stddraw.setPenColor(TEXT_COLOR)
+            stddraw.text(self.blc_x + self.width / 2,
+                         self.blc_y + self.height / 2, self.label)
+
+    # A method for checking whether the point (x, y) is inside this button
+    def contains(self, x, y):
+        if x < self.blc_x or x > self.blc_x + self.width:
+            return False
+        if y < self.blc_y or y > self.blc_y + self.height:
+            return False
+        return True
+
+
+# A function for clearing the canvas before drawing a menu
+def clear_menu():
+    stddraw.clear(BACKGROUND_COLOR)
+
+
+# A function for drawing a line of text on a menu
+def draw_text(x, y, text, font_size=20):
+    stddraw.setFontFamily("Arial")
+    stddraw.setFontSize(font_size)
+    stddraw.setPenColor(TEXT_COLOR)
+    stddraw.text(x, y, text)
+
+
+# A function that displays the drawn menu once and then blocks until one of
+# the given buttons is left-clicked, returning the value of that button
+# (when no buttons are given, any left-click ends the wait and None is returned)
+def wait_for_button(buttons=()):
+    # the menu is static, so it is copied to the window only once
+    stddraw.show(0)
+    # discard any click made before the menu was displayed
+    stddraw.mousePressed()
+    while True:
+        # sleep until the user does something instead of redrawing the
+        # menu periodically
+        stddraw.waitForEvent()
+        # keys typed while a menu is displayed are not game inputs
+        stddraw.clearKeysTyped()
+        if not stddraw.mousePressed():
+            continue
+        if len(buttons) == 0:
+            return None
+        mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
+        for button in buttons:
+            if button.contains(mouse_x, mouse_y):
+                return button.value
@@ -0,0 +1,60 @@
+import numpy as np  # used for representing the observations as arrays
+
+import lib.stddraw as stddraw  # used for reading the pixels of the canvas
+from tetromino import TETROMINO_TYPES  # the order of the one-hot piece encodings
+
+# the size of the matrix that holds the tiles of any tetromino
+PIECE_SIZE = 4
+
+
+# A function that returns the drawn game as an (height, width, 3) array of RGB
+# values without saving it to a file (the array is a view of the canvas when
+# possible, so it must be deleted before drawing the next frame; see
+# stddraw.pixels)
+def pixel_observation(width=None, height=None):
+    return stddraw.pixels(width, height)
+
+
+# A function that returns the one-hot encoding of the type of a tetromino
+def encode_type(tetromino):
+    one_hot = np.zeros(len(TETROMINO_TYPES), dtype=np.uint8)
+    if tetromino is not None:
+        one_hot[TETROMINO_TYPES.index(tetromino.type)] = 1
+    return one_hot
+
+
+# A function that returns the exponents of the tile numbers of a tetromino in
+# a PIECE_SIZE x PIECE_SIZE matrix (the rows of its tile matrix top first)
+def encode_tiles(tetromino):
+    exponents = np.zeros((PIECE_SIZE, PIECE_SIZE), dtype=np.uint8)
+    if tetromino is not None:
+        n = len(tetromino.tile_matrix)
+        for row in range(n):
+            for col in range(n):
+                tile = tetromino.tile_matrix[row][col]
+                if tile is not None:
+                    exponents[row, col] = tile.number.bit_length() - 1
+    return exponents
+
+
+# A function that returns a symbolic observation of the game as a dictionary
+# of arrays: the exponents of the locked tiles ("board"), the exponents of the
+# tiles of the falling tetromino at their grid positions ("current"), these two
+# planes stacked ("planes") and the types and tiles of the current and the next
+# tetromino ("current_type", "current_tiles", "next_type", "next_tiles")
+def symbolic_observation(grid, next_tetromino=None):
+    board = grid.get_exponent_matrix()
+    current = np.zeros_like(board)
+    tetromino = grid.current_tetromino
+    if tetromino is not None:
+        for row, col, x, y in tetromino.get_cell_positions():
+            # the tiles above the game grid are not observed
+            if grid.is_inside(y, x):
+                current[y, x] = tetromino.tile_matrix[row][col].number.bit_length() - 1
+    return {"board": board,
+            "current": current,
+            "planes": np.stack([board, current]),
+            "current_type": encode_type(tetromino),
+            "current_tiles": encode_tiles(tetromino),
+            "next_type": encode_type(next_tetromino),
+            "next_tiles": encode_tiles(next_tetromino)}
@@ -0,0 +1,266 @@
+################################################################################
+#                                                                              #
+# An archive file format that packs many recorded headless games into a       #
+# single file with an index, so that any tick of any game is read by seeking   #
+#                                                                              #
+################################################################################
+
+import mmap  # used for reading the archives without loading them
+import random  # used for creating the restored tetrominoes
+import struct  # used for the binary records of the archives
+import numpy as np  # used for the views of the index and the keyframe tables
+from headless_game import HeadlessGame, ACTIONS
+# used for restoring the tetrominoes
+from tetromino import Tetromino, SHAPE_REGISTRY, TETROMINO_TYPES
+from tile import Tile  # used for restoring the tiles
+
+# The layout of an archive (all the numbers are little-endian):
+#   file header: magic, grid height, grid width, keyframe interval, number of
+#       games, offset of the index
+#   for each game:
+#       game header: seed, number of ticks, number of events, number of
+#           keyframes, final score
+#       keyframe table: (tick, offset in the events) for each keyframe
+#       keyframe states: the state of the game at each keyframe (see
+#           encode_state), all of the same size
+#       events: a byte for each action (the index in ACTIONS plus 1) and for
+#           each tick (TICK) in the order they were applied
+#   index: the offset of each game (uint64)
+# A keyframe is saved at the start of each game and after every keyframe
+# interval ticks, so reading a tick replays at most that many ticks.
+MAGIC = b"T2048RA3"
+_FILE_HEADER = struct.Struct("<8sHHIIQ")
+_GAME_HEADER = struct.Struct("<qIIIq")
+_KEYFRAME_ENTRY = np.dtype([("tick", "<u4"), ("event", "<u4")])
+# the state header: number of tetrominoes, score, number of locked
+# tetrominoes, number of merges, number of cleared lines, number of removed
+# floating tiles, peak exponent, game over
+_STATE_HEADER = struct.Struct("<IqIIIIBB")
+# a tetromino: type index, position, exponents of its (padded) tile matrix
+_PIECE = struct.Struct("<Bhh16s")
+# the event of a tick (the actions are 1, 2, ...)
+TICK = 0
+# the default number of ticks between two keyframes
+DEFAULT_KEYFRAME_INTERVAL = 64
+
+
+# A function that returns the size of the state of a game on a grid with the
+# given dimensions (see encode_state)
+def get_state_size(grid_h, grid_w):
+    return _STATE_HEADER.size + 2 * grid_h * grid_w + 2 * _PIECE.size
+
+
+# A function that returns the bytes of a tetromino (see _PIECE)
+def encode_piece(tetromino):
+    n = len(tetromino.tile_matrix)
+    exponents = bytearray(16)
+    for row in range(n):
+        for col in range(n):
+            tile = tetromino.tile_matrix[row][col]
+            if tile is not None:
+                exponents[row * n + col] = tile.number.bit_length() - 1
+    return _PIECE.pack(TETROMINO_TYPES.index(tetromino.type),
+                       tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y,
+                       bytes(exponents))
+
+
+# A function that returns the tetromino encoded at the given offset of the
+# given buffer (see encode_piece)
+def decode_piece(buffer, offset):
+    type_index, x, y, exponents = _PIECE.unpack_from(buffer, offset)
+    shape = TETROMINO_TYPES[type_index]
+    # the random tiles and position of the new tetromino are replaced below
+    tetromino = Tetromino(shape, random.Random(0))
+    n = SHAPE_REGISTRY[shape].n
+    tile_matrix = np.full((n, n), None)
+    for row in range(n):
+        for col in range(n):
+            if exponents[row * n + col]:
+                tile_matrix[row][col] = Tile(2 ** exponents[row * n + col])
+    tetromino.set_tile_matrix(tile_matrix)
+    tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y = x, y
+    return tetromino
+
+
+# A function that returns the state of the given game as bytes: the counters,
+# the score, the exponents of the locked tiles, a mask of the cells deferred
+# to the next merge pass (in the scan order of MergeWorklist) and the current
+# and the next tetromino (the tick is stored in the keyframe table)
+def encode_state(game):
+    grid = game.grid
+    header = _STATE_HEADER.pack(game.n_tetrominoes, grid.score, grid.n_locked,
+                                grid.n_merges, grid.n_lines_cleared,
+                                grid.n_floating_removed, grid.peak_exponent,
+                                game.game_over)
+    deferred = np.zeros(grid.grid_height * grid.grid_width, np.uint8)
+    deferred[list(grid.deferred_merge_cells)] = 1
+    return header + grid.exponent_matrix.tobytes() + deferred.tobytes() + \
+        encode_piece(game.current_tetromino) + encode_piece(game.next_tetromino)
+
+
+# A function for restoring the state encoded at the given offset of the given
+# buffer (see encode_state) to the given game at the given tick
+def restore_state(game, buffer, offset, tick):
+    grid = game.grid
+    (game.n_tetrominoes, grid.score, grid.n_locked, grid.n_merges,
+     grid.n_lines_cleared, grid.n_floating_removed, peak_exponent,
+     game_over) = _STATE_HEADER.unpack_from(buffer, offset)
+    game.game_over = grid.game_over = bool(game_over)
+    game.n_ticks = tick
+    offset += _STATE_HEADER.size
+    exponents = np.frombuffer(buffer, np.uint8, grid.grid_height * grid.grid_width,
+                              offset).reshape(grid.grid_height, grid.grid_width)
+    for row, col in zip(*np.nonzero(exponents)):
+        grid.set_tile(int(row), int(col), Tile(2 ** int(exponents[row, col])))
+    offset += exponents.size
+    # the restored tiles are settled, only the deferred cells are merged again
+    grid.pop_changed_cells()
+    deferred = np.frombuffer(buffer, np.uint8, exponents.size, offset)
+    grid.deferred_merge_cells = set(np.flatnonzero(deferred).tolist())
+    # set_tile only raises the peak, and the peak tile may have been cleared
+    grid.peak_exponent = peak_exponent
+    offset += deferred.size
+    game.current_tetromino = decode_piece(buffer, offset)
+    game.next_tetromino = decode_piece(buffer, offset + _PIECE.size)
+    grid.current_tetromino = None if game.game_over else game.current_tetromino
+    grid.next_tetromino = game.next_tetromino
+
+
+# A class for recording a headless game with its keyframes: the actions and the
+# ticks are applied to the game through this class
+class GameRecorder:
+    # A constructor for creating a recorder of a new game with the given seed
+    def __init__(self, seed, grid_h=20, grid_w=12,
+                 keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self.game = HeadlessGame(grid_h, grid_w, seed)
+        self.keyframe_interval = keyframe_interval
+        self.events = bytearray()
+        # the ticks, the event offsets and the states of the keyframes
+        self.keyframes = [(0, 0, encode_state(self.game))]
+
+    # A method for applying and recording the given action
+    def apply_action(self, action):
+        if self.game.game_over:
+            return False
+        self.events.append(ACTIONS.index(action) + 1)
+        return self.game.apply_action(action)
+
+    # A method for applying and recording a tick
+    def tick(self):
+        if self.game.game_over:
+            return
+        self.game.tick()
+        self.events.append(TICK)
+        if self.game.n_ticks % self.keyframe_interval == 0:
+            self.keyframes.append((self.game.n_ticks, len(self.events),
+                                   encode_state(self.game)))
+
+
+# A class for writing the recorded games to a new archive file (the index is
+# written by close)
+class ArchiveWriter:
+    # A constructor for creating an archive for games on a grid with the given
+    # dimensions and the given keyframe interval
+    def __init__(self, path, grid_h=20, grid_w=12,
+                 keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self.grid_height, self.grid_width = grid_h, grid_w
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        # the header is written again by close with the index offset
+        self.file.write(_FILE_HEADER.pack(MAGIC, grid_h, grid_w,
+                                          keyframe_interval, 0, 0))
+        self.offsets = []
+
+    # A method for appending the game of the given recorder to the archive
+    def add_game(self, recorder):
+        game = recorder.game
+        if (game.grid.grid_height, game.grid.grid_width) != \
+                (self.grid_height, self.grid_width) or \
+                recorder.keyframe_interval != self.keyframe_interval:
+            raise ValueError("the game does not match the archive")
+        self.offsets.append(self.file.tell())
+        self.file.write(_GAME_HEADER.pack(game.seed, game.n_ticks,
+                                          len(recorder.events),
+                                          len(recorder.keyframes),
+                                          game.grid.score))
+        table = np.array([(tick, event) for tick, event, state
+                          in recorder.keyframes], dtype=_KEYFRAME_ENTRY)
+        self.file.write(table.tobytes())
+        for tick, event, state in recorder.keyframes:
+            self.file.write(state)
+        self.file.write(recorder.events)
+
+    # A method for writing the index and closing the archive
+    def close(self):
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.offsets, dtype="<u8").tobytes())
+        self.file.seek(0)
+        self.file.write(_FILE_HEADER.pack(MAGIC, self.grid_height,
+                                          self.grid_width, self.keyframe_interval,
+                                          len(self.offsets), index_offset))
+        self.file.close()
+
+
+# A class for reading the games of an archive file. The file is memory-mapped,
+# so only the pages of the index, the keyframe tables and the events that are
+# read are loaded, and reading the state of a game at a tick restores the
+# nearest keyframe before the tick and replays the events after it.
+class ReplayArchive:
+    # A constructor for opening the archive file with the given path
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.grid_height, self.grid_width, self.keyframe_interval,
+         self.n_games, index_offset) = _FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("not a replay archive: " + path)
+        self.state_size = get_state_size(self.grid_height, self.grid_width)
+        self.offsets = np.frombuffer(self.mm, "<u8", self.n_games, index_offset)
+
+    # A method that returns the number of games in this archive
+    def __len__(self):
+        return self.n_games
+
+    # A method that returns the seed, the number of ticks and the final score
+    # of the given game as a dictionary
+    def get_game_info(self, game_index):
+        seed, n_ticks, n_events, n_keyframes, score = _GAME_HEADER.unpack_from(
+            self.mm, int(self.offsets[game_index]))
+        return {"seed": seed, "n_ticks": n_ticks, "score": score}
+
+    # A method that returns the given game (a HeadlessGame) at the given tick,
+    # that is after the tick and before the actions that follow it (at the end
+    # of the game, after all the actions, by default)
+    def load_game(self, game_index, tick=None):
+        offset = int(self.offsets[game_index])
+        seed, n_ticks, n_events, n_keyframes, score = \
+            _GAME_HEADER.unpack_from(self.mm, offset)
+        if tick is not None and not 0 <= tick <= n_ticks:
+            raise ValueError("the game has no tick " + str(tick))
+        offset += _GAME_HEADER.size
+        table = np.frombuffer(self.mm, _KEYFRAME_ENTRY, n_keyframes, offset)
+        states_offset = offset + table.nbytes
+        events_offset = states_offset + n_keyframes * self.state_size
+        # restore the last keyframe at or before the tick
+        k = int(np.searchsorted(table["tick"], n_ticks if tick is None else tick,
+                                side="right")) - 1
+        game = HeadlessGame(self.grid_height, self.grid_width, seed)
+        restore_state(game, self.mm, states_offset + k * self.state_size,
+                      int(table["tick"][k]))
+        # replay the events after the keyframe until the tick
+        for event in self.mm[events_offset + int(table["event"][k]):
+                             events_offset + n_events]:
+            if game.n_ticks == tick:
+                break
+            if event == TICK:
+                game.tick()
+            else:
+                game.apply_action(ACTIONS[event - 1])
+        return game
+
+    # A method for closing this archive
+    def close(self):
+        # the views of the memory map must be released before it is closed
+        self.offsets = None
+        self.mm.close()
+        self.file.close()
@@ -0,0 +1,102 @@
+from collections import deque, namedtuple  # the ring buffer and the snapshots
+from replay_archive import encode_piece, decode_piece  # the saved tetrominoes
+from tile import Tile  # used for restoring the tiles
+
+# the default number of snapshots kept by a rewind buffer
+DEFAULT_CAPACITY = 1000
+
+# A snapshot of a game: the rows of the exponents of the locked tiles (a tuple
+# of tuples, the rows that have not changed are the same tuple objects as in
+# the previous snapshot), the score, the counters (n_locked, n_merges,
+# n_lines_cleared, n_floating_removed, peak_exponent) and the game over flag
+# of the grid, the cells deferred to the next merge pass, the encoded current
+# and next tetrominoes (see replay_archive.encode_piece) and the information
+# given to record
+Snapshot = namedtuple("Snapshot", ["rows", "score", "counters", "game_over",
+                                   "deferred_merge_cells", "current", "next",
+                                   "info"])
+
+
+# A class for keeping the snapshots of the last capacity ticks of a game on the
+# given game grid in a ring buffer, e.g. for rewinding a game in the practice
+# mode or for inspecting the decisions of a bot. A snapshot shares the rows of
+# the grid that have not changed since the previous snapshot (most ticks change
+# one or two rows or none), so the memory used is bounded by the capacity and
+# the changed rows. The changed rows are collected by GameGrid.set_tile (see
+# GameGrid.pop_changed_rows), so a grid can have only one rewind buffer.
+class RewindBuffer:
+    # A constructor for creating an empty rewind buffer for the given grid
+    def __init__(self, game_grid, capacity=DEFAULT_CAPACITY):
+        self.grid = game_grid
+        self.snapshots = deque(maxlen=capacity)
+        # the rows of the grid when the last snapshot was taken or restored
+        self.rows = tuple(tuple(row) for row in game_grid.exponent_matrix.tolist())
+        game_grid.pop_changed_rows()
+
+    # A method that returns the number of snapshots in this buffer
+    def __len__(self):
+        return len(self.snapshots)
+
+    # A method for taking a snapshot of the grid and the given current and next
+    # tetrominoes with the given information (e.g. the number of tetrominoes)
+    def record(self, current_tetromino, next_tetromino, info=None):
+        grid = self.grid
+        changed_rows = grid.pop_changed_rows()
+        if changed_rows:
+            rows = list(self.rows)
+            for row in changed_rows:
+                rows[row] = tuple(grid.exponent_matrix[row].tolist())
+            self.rows = tuple(rows)
+        self.snapshots.append(Snapshot(
+            self.rows, grid.score,
+            (grid.n_locked, grid.n_merges, grid.n_lines_cleared,
+             grid.n_floating_removed, grid.peak_exponent),
+            grid.game_over,
+            frozenset(grid.deferred_merge_cells), encode_piece(current_tetromino),
+            encode_piece(next_tetromino), info))
+
+    # A method that returns the snapshot taken n_steps snapshots before the
+    # last one (None if there is no such snapshot)
+    def peek(self, n_steps=0):
+        if not 0 <= n_steps < len(self.snapshots):
+            return None
+        return self.snapshots[-1 - n_steps]
+
+    # A method for rewinding the game by n_steps snapshots: the last n_steps
+    # snapshots are discarded and the grid is restored to the snapshot before
+    # them, which is kept as the last one. Returns the restored (current
+    # tetromino, next tetromino, info) tuple, or None if there are not enough
+    # snapshots. Only the rows that differ from the current grid are restored,
+    # so each step takes a constant time.
+    def rewind(self, n_steps=1):
+        if not 0 < n_steps < len(self.snapshots):
+            return None
+        for _ in range(n_steps):
+            self.snapshots.pop()
+        snapshot = self.snapshots[-1]
+        grid = self.grid
+        # the rows changed after the last snapshot and the rows that differ
+        # between the last snapshot and the restored one
+        changed_rows = grid.pop_changed_rows()
+        changed_rows.update(row for row in range(grid.grid_height)
+                            if snapshot.rows[row] is not self.rows[row])
+        for row in changed_rows:
+            for col, exponent in enumerate(snapshot.rows[row]):
+                if grid.exponent_matrix[row, col] != exponent:
+                    grid.set_tile(row, col, Tile(2 ** exponent) if exponent else None)
+        grid.pop_changed_rows()
+        self.rows = snapshot.rows
+        grid.score = snapshot.score
+        (grid.n_locked, grid.n_merges, grid.n_lines_cleared,
+         grid.n_floating_removed, grid.peak_exponent) = snapshot.counters
+        grid.game_over = snapshot.game_over
+        grid.deferred_merge_cells = set(snapshot.deferred_merge_cells)
+        current_tetromino = decode_piece(snapshot.current, 0)
+        next_tetromino = decode_piece(snapshot.next, 0)
+        grid.current_tetromino = None if grid.game_over else current_tetromino
+        grid.next_tetromino = next_tetromino
+        return current_tetromino, next_tetromino, snapshot.info
+
+    # A method for discarding all the snapshots
+    def clear(self):
+        self.snapshots.clear()
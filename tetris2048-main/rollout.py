@@ -0,0 +1,185 @@
+import os  # used for the number of CPUs and the priority of the workers
+import random  # used for the seeded random rollouts
+import time  # used for the time budget of the suggestions
+from concurrent.futures import ProcessPoolExecutor, wait  # used for the workers
+from simulation import BoardState, get_afterstate  # used for the rollouts
+import shared_boards  # used for passing the boards to the workers
+from tetromino import SHAPE_REGISTRY, TETROMINO_TYPES, get_shape_rotation_states
+
+# the tetromino types of the pieces in the rollouts (the standard tetrominoes
+# as in create_tetromino, not the custom shapes of tetromino.register_shape)
+ROLLOUT_TYPES = TETROMINO_TYPES
+# the value of a placement that ends the game itself (lower than any score)
+GAME_OVER_VALUE = -10 ** 9
+# the penalty subtracted from the score of a rollout that ends the game (finite,
+# so that the mean value of a placement reflects how many of its random
+# rollouts end the game)
+ROLLOUT_GAME_OVER_PENALTY = 1000
+# the number of boards that can be evaluated at the same time (the board of a
+# cancelled suggestion stays in use until its running workers are done)
+_N_SLOTS = 4
+# the time in seconds between the checks for the cancellation of a suggestion
+_CANCEL_CHECK_INTERVAL = 0.01
+# the niceness added to the worker processes, so that they do not slow down
+# the process that draws the game
+_WORKER_NICENESS = 10
+
+
+# A function for lowering the priority of a worker process (where possible)
+def _init_worker():
+    if hasattr(os, "nice"):
+        os.nice(_WORKER_NICENESS)
+
+
+# A function that runs a random rollout from the given board state for the
+# given number of pieces and returns the score gained (minus
+# ROLLOUT_GAME_OVER_PENALTY if the game ends). The pieces come from piece_rng,
+# so that the rollouts with the same seed use the same pieces for every
+# candidate placement, and each piece is dropped at one of its lowest
+# placements chosen by policy_rng.
+def run_rollout(state, n_pieces, piece_rng, policy_rng):
+    state = state.copy()
+    start_score = state.score
+    for _ in range(n_pieces):
+        shape = piece_rng.choice(ROLLOUT_TYPES)
+        numbers = [piece_rng.choice([2, 4])
+                   for _ in SHAPE_REGISTRY[shape].rotations[0].cells]
+        placements = state.get_placements(get_shape_rotation_states(shape, numbers))
+        if not placements:
+            return state.score - start_score - ROLLOUT_GAME_OVER_PENALTY
+        lowest_row = min(placement.row for placement in placements)
+        placement = policy_rng.choice([placement for placement in placements
+                                       if placement.row == lowest_row])
+        if state.lock(placement):
+            state.settle()
+            return state.score - start_score - ROLLOUT_GAME_OVER_PENALTY
+        state.settle()
+    return state.score - start_score
+
+
+# A function that evaluates a candidate placement on the board with the given
+# version in the given slot of the shared board batch with the given spec (see
+# shared_boards.SharedBoardBatch.get_spec) and returns the mean value of
+# n_rollouts rollouts of n_pieces pieces after the placement plus the score
+# gained by the placement itself (GAME_OVER_VALUE if the placement itself ends
+# the game, or None if the board has been replaced).
+# This runs in the worker processes.
+def evaluate_placement(batch_spec, slot, version, placement, n_rollouts,
+                       n_pieces, seed):
+    state = shared_boards.attach(batch_spec).read_state(slot, version)
+    if state is None:
+        return None
+    after, delta, game_over = get_afterstate(state, placement)
+    if game_over:
+        return GAME_OVER_VALUE
+    total = 0
+    for k in range(n_rollouts):
+        piece_rng = random.Random("%d-%d" % (seed, k))
+        policy_rng = random.Random("%d-%d-%d-%d-%d" % (seed, k, placement.rotation,
+                                                       placement.col, placement.row))
+        total += run_rollout(after, n_pieces, piece_rng, policy_rng)
+    return delta + total / n_rollouts
+
+
+# A class for suggesting the placement of the current tetromino by running
+# seeded random rollouts for each candidate placement in a pool of worker
+# processes. The board is passed to the workers as a uint8 matrix of exponents
+# in a slot of a shared board batch instead of pickling the Tile objects of the
+# grid, so the workers only receive the slot and the candidate placement.
+class RolloutAdvisor:
+    # A constructor for creating an advisor that runs n_rollouts rollouts of
+    # n_pieces pieces per candidate placement in max_workers processes (one
+    # less than the number of CPUs by default, so that a CPU is left for
+    # drawing the game) and waits at most time_budget seconds
+    def __init__(self, n_rollouts=16, n_pieces=4, time_budget=0.5,
+                 max_workers=None, seed=0):
+        self.n_rollouts = n_rollouts
+        self.n_pieces = n_pieces
+        self.time_budget = time_budget
+        self.seed = seed
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) - 1)
+        self.executor = ProcessPoolExecutor(max_workers, initializer=_init_worker)
+        # the boards being evaluated (created for the size of the first board)
+        self.batch = None
+        self.slots = shared_boards.SlotCoordinator(_N_SLOTS)
+
+    # A method that returns the best placement (see GameGrid.get_placements) of
+    # the given tetromino on the given game grid, or None if it has no
+    # placements (see suggest_placement)
+    def suggest(self, game_grid, tetromino, time_budget=None):
+        return self.suggest_placement(game_grid.get_exponent_matrix(),
+                                      game_grid.score,
+                                      tetromino.get_rotation_states(), time_budget)
+
+    # A method that returns the best placement of a tetromino with the given
+    # rotation states (see Tetromino.get_rotation_states) on a board with the
+    # given exponent matrix (see GameGrid.get_exponent_matrix) and score, or
+    # None if it has no placements. Only the candidates evaluated within the
+    # time budget (the time_budget of this advisor by default) are compared,
+    # and if none of them is evaluated in time, the placement with the best
+    # immediate score is returned. The search also stops early when the
+    # optional cancelled event (a threading.Event) is set.
+    def suggest_placement(self, exponents, score, rotation_states,
+                          time_budget=None, cancelled=None):
+        if time_budget is None:
+            time_budget = self.time_budget
+        deadline = time.perf_counter() + time_budget
+        state = BoardState(exponents.tolist(), score)
+        placements = state.get_placements(rotation_states)
+        if not placements:
+            return None
+        values = {}
+        slot = self.get_slot(exponents.shape)
+        # without a free slot, only the immediate scores are compared
+        if slot is not None:
+            version = self.batch.write(slot, exponents, score)
+            futures = {self.executor.submit(evaluate_placement,
+                                            self.batch.get_spec(), slot, version,
+                                            placement, self.n_rollouts,
+                                            self.n_pieces, self.seed): placement
+                       for placement in placements}
+            self.slots.release_when_done(slot, list(futures))
+            # wait in short steps to notice the cancellation
+            while True:
+                timeout = deadline - time.perf_counter()
+                if cancelled is not None:
+                    timeout = min(timeout, _CANCEL_CHECK_INTERVAL)
+                done, not_done = wait(futures, timeout=max(0, timeout))
+                if not not_done or time.perf_counter() >= deadline \
+                        or (cancelled is not None and cancelled.is_set()):
+                    break
+            # the candidates that have not started yet are not evaluated
+            for future in not_done:
+                future.cancel()
+            values = {futures[future]: future.result() for future in done
+                      if not future.cancelled() and future.exception() is None
+                      and future.result() is not None}
+        if not values:
+            return max(placements,
+                       key=lambda placement: get_afterstate(state, placement)[1])
+        # the first best candidate in the order of the placements is returned
+        best_value = max(values.values())
+        return next(placement for placement in placements
+                    if values.get(placement) == best_value)
+
+    # A method that returns a free slot of the shared board batch for a board
+    # of the given shape, or None if all the slots are in use
+    def get_slot(self, shape):
+        if self.batch is not None and \
+                (self.batch.grid_height, self.batch.grid_width) != tuple(shape):
+            # the workers still reading the old batch have their own mapping
+            self.batch.unlink()
+            self.batch = None
+            self.slots = shared_boards.SlotCoordinator(_N_SLOTS)
+        if self.batch is None:
+            self.batch = shared_boards.SharedBoardBatch(_N_SLOTS, *shape)
+        return self.slots.acquire()
+
+    # A method for stopping the worker processes (the candidates that are
+    # being evaluated are finished first) and removing the shared boards
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        if self.batch is not None:
+            self.batch.unlink()
+            self.batch = None
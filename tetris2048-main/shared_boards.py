@@ -0,0 +1,135 @@
+import threading  # used for handing out the slots from several threads
+from multiprocessing import shared_memory  # used for sharing the boards
+import numpy as np  # used for the views of the shared memory block
+from simulation import BoardState  # used for reading a board as a board state
+
+# the fields of the header of each board (stored as int64 values): the score of
+# the game and the number of times the board has been written, so that a reader
+# can tell whether the slot still holds the board it was given
+HEADER_FIELDS = ["score", "version"]
+SCORE, VERSION = range(len(HEADER_FIELDS))
+
+# the batches attached by this process (see attach), by the name of the block
+_attached = {}
+
+
+# A class for modeling a batch of boards in a single shared memory block, so
+# that the boards of many games are passed to worker processes without copying
+# or pickling: the block holds an (n_boards, len(HEADER_FIELDS)) int64 array of
+# headers followed by an (n_boards, grid_h, grid_w) uint8 array of exponents
+# (see GameGrid.get_exponent_matrix), and both are numpy views of the block.
+# The process that creates a batch removes it with unlink, and the processes
+# that attach to it only close it.
+class SharedBoardBatch:
+    # A constructor for creating a batch of n_boards empty boards, or for
+    # attaching to the existing batch with the given name
+    def __init__(self, n_boards, grid_h, grid_w, name=None):
+        self.n_boards = n_boards
+        self.grid_height, self.grid_width = grid_h, grid_w
+        header_size = n_boards * len(HEADER_FIELDS) * 8
+        size = header_size + n_boards * grid_h * grid_w
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.headers = np.ndarray((n_boards, len(HEADER_FIELDS)), np.int64,
+                                  buffer=self.shm.buf)
+        self.boards = np.ndarray((n_boards, grid_h, grid_w), np.uint8,
+                                 buffer=self.shm.buf, offset=header_size)
+        if name is None:
+            self.headers[:] = 0
+            self.boards[:] = 0
+
+    # A method that returns the (name, n_boards, grid_h, grid_w) tuple that is
+    # given to the other processes for attaching to this batch (see attach)
+    def get_spec(self):
+        return (self.shm.name, self.n_boards, self.grid_height, self.grid_width)
+
+    # A method for writing the given exponent matrix and score to the given
+    # slot, returns the version of the written board
+    def write(self, slot, exponents, score):
+        self.boards[slot] = exponents
+        self.headers[slot, SCORE] = score
+        self.headers[slot, VERSION] += 1
+        return int(self.headers[slot, VERSION])
+
+    # A method that returns the board in the given slot as a board state, or
+    # None if the slot has been written again since the given version
+    def read_state(self, slot, version=None):
+        if version is not None and self.headers[slot, VERSION] != version:
+            return None
+        return BoardState(self.boards[slot].tolist(),
+                          int(self.headers[slot, SCORE]))
+
+    # A method for closing the views of the block in this process
+    def close(self):
+        # the views must be released before the block can be closed
+        self.headers, self.boards = None, None
+        self.shm.close()
+
+    # A method for closing and removing the block (in the creating process)
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+# A function that returns the batch with the given spec (see get_spec) attached
+# to this process. The batch stays attached for the next calls with the same
+# spec, so a worker process maps the block only once, and the batch that was
+# attached before is closed.
+def attach(spec):
+    name = spec[0]
+    batch = _attached.get(name)
+    if batch is None:
+        for other in _attached.values():
+            other.close()
+        _attached.clear()
+        batch = SharedBoardBatch(*spec[1:], name=name)
+        _attached[name] = batch
+    return batch
+
+
+# A class for handing out the slots of a batch of boards: a slot is acquired
+# before a board is written to it and released after every worker that was
+# given the board is done with it, so a board is never overwritten while it is
+# being read
+class SlotCoordinator:
+    # A constructor for creating a coordinator for the given number of slots
+    def __init__(self, n_slots):
+        self.free_slots = list(range(n_slots - 1, -1, -1))
+        self.users = [0] * n_slots
+        self.lock = threading.Lock()
+
+    # A method that returns a free slot, or None if all the slots are in use
+    def acquire(self):
+        with self.lock:
+            return self.free_slots.pop() if self.free_slots else None
+
+    # A method for releasing the given slot after the given futures (as
+    # returned by concurrent.futures executors) are done or cancelled, or
+    # immediately if there are no futures
+    def release_when_done(self, slot, futures):
+        with self.lock:
+            self.users[slot] = len(futures)
+        if not futures:
+            self.release(slot)
+        for future in futures:
+            future.add_done_callback(lambda _: self._release_user(slot))
+
+    # A method for releasing the given slot
+    def release(self, slot):
+        with self.lock:
+            self.users[slot] = 0
+            self.free_slots.append(slot)
+
+    # A method for counting a worker as done with the given slot
+    def _release_user(self, slot):
+        with self.lock:
+            self.users[slot] -= 1
+            if self.users[slot] == 0:
+                self.free_slots.append(slot)
+
+    # A method that returns the number of free slots
+    def n_free(self):
+        with self.lock:
+            return len(self.free_slots)
@@ -0,0 +1,219 @@
+from tetromino import find_placements  # used for the placements on a board state
+from tile import MergeWorklist  # used for the worklist of merge_tiles
+
+
+# A class for modeling a scratch copy of the game grid for searching placements:
+# the cells are plain lists of the exponents of the tile numbers (0 denotes an
+# empty cell and row 0 is the bottom row), so copying a board state does not
+# copy any Tile objects. The rules are the same as those of the GameGrid class
+# (Tile.merge_tiles, GameGrid.remove_floating_tetrominos and
+# GameGrid.remove_full_rows), applied in the same order by settle.
+class BoardState:
+    # A constructor for creating a board state with the given cells and score,
+    # the next merge pass checks the given deferred cells (see MergeWorklist,
+    # the cells where a tile would be merged or moved by default)
+    def __init__(self, cells, score=0, deferred_merge_cells=None):
+        self.cells = cells
+        self.grid_height = len(cells)
+        self.grid_width = len(cells[0])
+        self.score = score
+        # the (row, col) cells changed since the last merge pass
+        self.changed_cells = set()
+        if deferred_merge_cells is None:
+            deferred_merge_cells = self.get_unsettled_cells()
+        self.deferred_merge_cells = deferred_merge_cells
+
+    # A method that returns a copy of this board state
+    def copy(self):
+        state = BoardState([row[:] for row in self.cells], self.score,
+                           set(self.deferred_merge_cells))
+        state.changed_cells = set(self.changed_cells)
+        return state
+
+    # A method that returns the cells (as indexes, see MergeWorklist) where a
+    # tile would be merged with its top neighbor or moved down by a merge pass
+    def get_unsettled_cells(self):
+        cells = self.cells
+        rows, cols = self.grid_height, self.grid_width
+        unsettled = set()
+        for row in range(rows):
+            for col in range(cols):
+                exponent = cells[row][col]
+                if exponent == 0:
+                    continue
+                if row < rows - 1 and cells[row + 1][col] == exponent:
+                    unsettled.add(col * rows + row)
+                elif row > 0 and (row + 1 >= rows or cells[row + 1][col] == 0) \
+                        and cells[row - 1][col] == 0 and \
+                        (col + 1 >= cols or cells[row][col + 1] == 0) and \
+                        (col - 1 < 0 or cells[row][col - 1] == 0):
+                    unsettled.add(col * rows + row)
+        return unsettled
+
+    # A method that returns the height of each column (see GameGrid)
+    def get_column_heights(self):
+        heights = [0] * self.grid_width
+        for row in range(self.grid_height):
+            for col, exponent in enumerate(self.cells[row]):
+                if exponent:
+                    heights[col] = row + 1
+        return heights
+
+    # A method that returns the placements of a tetromino with the given
+    # rotation states (see Tetromino.get_rotation_states) on this board state
+    def get_placements(self, rotation_states):
+        return find_placements(self.get_column_heights(), self.grid_height,
+                               rotation_states)
+
+    # A method that locks the tiles of a tetromino at the given placement and
+    # returns True if the game is over (a tile is above the topmost row)
+    def lock(self, placement):
+        game_over = False
+        for dx, dy, number in placement.cells:
+            row, col = placement.row + dy, placement.col + dx
+            if row < self.grid_height:
+                self.cells[row][col] = number.bit_length() - 1
+                self.changed_cells.add((row, col))
+            else:
+                game_over = True
+        return game_over
+
+    # A method that applies the rules until the board state does not change
+    # anymore (see GameGrid.settle)
+    def settle(self):
+        self.remove_full_rows()
+        while True:
+            previous_score = self.score
+            self.merge_tiles()
+            self.remove_floating_tiles()
+            n_removed_rows = self.remove_full_rows()
+            if self.score == previous_score and n_removed_rows == 0:
+                break
+
+    # A method for merging the equal tiles on top of each other by using a
+    # worklist of the changed cells (see Tile.merge_tiles, this method gives
+    # exactly the same results)
+    def merge_tiles(self):
+        changed = self.changed_cells
+        # nothing can be merged or moved when nothing has changed
+        if not changed and not self.deferred_merge_cells:
+            return
+        cells = self.cells
+        rows, cols = self.grid_height, self.grid_width
+        worklist = MergeWorklist(rows, cols, self.deferred_merge_cells)
+        while True:
+            for row, col in changed:
+                worklist.add_changed_cell(row, col)
+            changed.clear()
+            if not worklist.heap:
+                break
+            row, col = worklist.pop()
+            exponent = cells[row][col]
+            if exponent == 0:
+                continue
+            # merge with the top neighbor if possible
+            if row < rows - 1 and cells[row + 1][col] == exponent:
+                exponent += 1
+                cells[row][col] = exponent
+                self.score += 2 ** exponent
+                changed.add((row, col))
+                cells[row + 1][col] = 0
+                changed.add((row + 1, col))
+                # move the tiles above the merged tile down
+                for down_row in range(row + 1, rows):
+                    if cells[down_row][col]:
+                        cells[down_row - 1][col] = cells[down_row][col]
+                        cells[down_row][col] = 0
+                        changed.add((down_row - 1, col))
+                        changed.add((down_row, col))
+            # move the tile down if it has no neighbors
+            if row > 0:
+                if (row + 1 >= rows or cells[row + 1][col] == 0) and \
+                        cells[row - 1][col] == 0 and \
+                        (col + 1 >= cols or cells[row][col + 1] == 0) and \
+                        (col - 1 < 0 or cells[row][col - 1] == 0):
+                    cells[row - 1][col] = exponent
+                    cells[row][col] = 0
+                    changed.add((row - 1, col))
+                    changed.add((row, col))
+        self.deferred_merge_cells = worklist.deferred
+
+    # A method for removing the tiles that are not connected to the bottom row
+    # (see GameGrid.remove_floating_tetrominos)
+    def remove_floating_tiles(self):
+        cells = self.cells
+        rows, cols = self.grid_height, self.grid_width
+        # find the tiles connected to the bottom row (visited[row][col])
+        visited = [[False] * cols for _ in range(rows)]
+        stack = []
+        for col in range(cols):
+            if cells[0][col]:
+                visited[0][col] = True
+                stack.append((0, col))
+        n_connected = 0
+        while stack:
+            row, col = stack.pop()
+            if row + 1 < rows and cells[row + 1][col] and not visited[row + 1][col]:
+                visited[row + 1][col] = True
+                stack.append((row + 1, col))
+            if row > 0 and cells[row - 1][col] and not visited[row - 1][col]:
+                visited[row - 1][col] = True
+                stack.append((row - 1, col))
+            if col + 1 < cols and cells[row][col + 1] and not visited[row][col + 1]:
+                visited[row][col + 1] = True
+                stack.append((row, col + 1))
+            if col > 0 and cells[row][col - 1] and not visited[row][col - 1]:
+                visited[row][col - 1] = True
+                stack.append((row, col - 1))
+            n_connected += 1
+        # there is nothing to remove when every tile is connected (the tiles
+        # are counted row by row, without flattening the board)
+        if n_connected == sum(cols - row.count(0) for row in cells):
+            return
+        # remove the other tiles and add their numbers to the score
+        for row in range(rows):
+            for col in range(cols):
+                if cells[row][col] and not visited[row][col]:
+                    self.score += 2 ** cells[row][col]
+                    cells[row][col] = 0
+                    self.changed_cells.add((row, col))
+
+    # A method for removing the full rows and shifting down the rows above
+    # them (see GameGrid.remove_full_rows), returns the number of removed rows
+    def remove_full_rows(self):
+        cells = self.cells
+        full_rows = [row for row in range(self.grid_height) if all(cells[row])]
+        for row in reversed(full_rows):
+            self.score += sum(2 ** exponent for exponent in cells[row])
+            del cells[row]
+            cells.append([0] * self.grid_width)
+        # the cells from the lowest removed row up may have changed
+        if full_rows:
+            self.changed_cells.update((row, col)
+                                      for row in range(full_rows[0], self.grid_height)
+                                      for col in range(self.grid_width))
+        return len(full_rows)
+
+
+# A function that returns a board state with the locked tiles and the score of
+# the given game grid
+def from_grid(game_grid):
+    return BoardState(game_grid.get_exponent_matrix().tolist(), game_grid.score)
+
+
+# A function that returns the afterstate of locking a tetromino at the given
+# placement on the given board state (which is not changed) as a tuple of
+# (board state, score delta, game over)
+def get_afterstate(state, placement):
+    after = state.copy()
+    game_over = after.lock(placement)
+    after.settle()
+    return after, after.score - state.score, game_over
+
+
+# A function that returns the afterstates of every placement of a tetromino
+# with the given rotation states on the given board state as a list of
+# (placement, board state, score delta, game over) tuples
+def get_afterstates(state, rotation_states):
+    return [(placement,) + get_afterstate(state, placement)
+            for placement in state.get_placements(rotation_states)]
@@ -0,0 +1,165 @@
+import json  # used for encoding the messages as lines of text
+import numpy as np  # used for finding the changed cells
+
+# the default number of ticks between two keyframes
+KEYFRAME_INTERVAL = 50
+# the default number of bytes that may wait to be sent to a subscriber before
+# the subscriber is dropped for being too slow
+MAX_PENDING_BYTES = 64 * 1024
+
+# The messages of the stream of a game, one per tick, are JSON objects with
+# short keys. A keyframe has the whole state:
+#   {"k": 1, "s": sequence number, "t": tick, "b": board (rows of exponents,
+#    row 0 is the bottom row), "p": piece, "sc": score}
+# and a delta has only what has changed since the previous message:
+#   {"s": sequence number, "t": tick, "c": changed cells as a flat list of
+#    row, col, exponent values, "p": piece, "ds": score change}
+# where "c", "p" and "ds" are omitted when they have not changed. The piece is
+# a list of [row, col, exponent] cells of the active tetromino. The last
+# message of a stream tells that the session has ended:
+#   {"e": 1, "t": tick, "go": 1 if the game is over (0 if the session was
+#    closed before)}
+# and the connection is closed after it.
+
+
+# A function that returns the given message as a line of compact JSON (bytes)
+def encode_line(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+# A class for encoding the states of a game as keyframes and deltas
+class DeltaEncoder:
+    # A constructor for creating an encoder that makes a keyframe every
+    # keyframe_interval messages
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        # the last encoded state
+        self.board, self.piece, self.score = None, None, 0
+
+    # A method that returns the message for the given state: the tick, the
+    # board as a matrix of exponents, the piece (see above) and the score
+    def encode(self, tick, board, piece, score):
+        if self.seq % self.keyframe_interval == 0:
+            message = {"k": 1, "s": self.seq, "t": tick, "b": board.tolist(),
+                       "p": piece, "sc": score}
+        else:
+            message = {"s": self.seq, "t": tick}
+            rows, cols = np.nonzero(board != self.board)
+            if len(rows):
+                message["c"] = np.stack([rows, cols, board[rows, cols]],
+                                        axis=1).ravel().tolist()
+            if piece != self.piece:
+                message["p"] = piece
+            if score != self.score:
+                message["ds"] = score - self.score
+        self.board = board.copy()
+        self.piece, self.score = piece, score
+        self.seq += 1
+        return message
+
+
+# A function that returns the end message of a stream (see above)
+def encode_end(tick, game_over):
+    return {"e": 1, "t": tick, "go": int(game_over)}
+
+
+# A class for rebuilding the states of a game from its messages (e.g. in a
+# spectator client that joins the stream late)
+class DeltaDecoder:
+    # A constructor for creating a decoder that waits for a keyframe
+    def __init__(self):
+        self.seq, self.tick = None, None
+        self.board, self.piece, self.score = None, None, 0
+        # set by the end message of the stream
+        self.ended, self.game_over = False, False
+
+    # A method for applying the given message, returns False if the message
+    # is a delta received before the first keyframe (and is ignored)
+    def apply(self, message):
+        if "e" in message:
+            self.ended, self.game_over = True, bool(message["go"])
+            return True
+        if "k" in message:
+            self.board = np.array(message["b"], dtype=np.uint8)
+            self.piece, self.score = message["p"], message["sc"]
+        else:
+            if self.board is None:
+                return False
+            if message["s"] != self.seq + 1:
+                raise ValueError("missing message " + str(self.seq + 1))
+            cells = message.get("c", [])
+            for i in range(0, len(cells), 3):
+                self.board[cells[i], cells[i + 1]] = cells[i + 2]
+            self.piece = message.get("p", self.piece)
+            self.score += message.get("ds", 0)
+        self.seq, self.tick = message["s"], message["t"]
+        return True
+
+
+# A class for sending the stream of a game to many subscribers: each state is
+# encoded once and the same line is written to every subscriber (an asyncio
+# StreamWriter). A new subscriber first receives the messages since the last
+# keyframe, so it can join at any time, and a subscriber that does not read
+# fast enough is dropped instead of buffering the stream without bound.
+class Broadcaster:
+    # A constructor for creating a broadcaster without any subscribers
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL,
+                 max_pending_bytes=MAX_PENDING_BYTES):
+        self.encoder = DeltaEncoder(keyframe_interval)
+        self.max_pending_bytes = max_pending_bytes
+        self.subscribers = set()
+        # the encoded messages since the last keyframe (including it)
+        self.backlog = []
+        # the end message after the stream is closed (see close)
+        self.end_line = None
+        # the number of bytes sent and the number of subscribers dropped
+        self.n_bytes_sent, self.n_dropped = 0, 0
+
+    # A method for encoding the given state (see DeltaEncoder.encode) and
+    # sending it to every subscriber
+    def publish(self, tick, board, piece, score):
+        message = self.encoder.encode(tick, board, piece, score)
+        line = encode_line(message)
+        if "k" in message:
+            self.backlog = []
+        self.backlog.append(line)
+        for writer in list(self.subscribers):
+            if writer.is_closing() or \
+                    writer.transport.get_write_buffer_size() > self.max_pending_bytes:
+                self.unsubscribe(writer)
+                writer.close()
+                self.n_dropped += 1
+                continue
+            writer.write(line)
+            self.n_bytes_sent += len(line)
+
+    # A method for adding the given subscriber (it receives the backlog first,
+    # and it is closed after the end message if the stream is closed)
+    def subscribe(self, writer):
+        for line in self.backlog:
+            writer.write(line)
+            self.n_bytes_sent += len(line)
+        if self.end_line is not None:
+            writer.write(self.end_line)
+            self.n_bytes_sent += len(self.end_line)
+            writer.close()
+            return
+        self.subscribers.add(writer)
+
+    # A method for ending the stream at the given tick: the end message (see
+    # encode_end) is sent to every subscriber and the subscribers are closed
+    def close(self, tick, game_over):
+        if self.end_line is not None:
+            return
+        self.end_line = encode_line(encode_end(tick, game_over))
+        for writer in list(self.subscribers):
+            self.unsubscribe(writer)
+            if not writer.is_closing():
+                writer.write(self.end_line)
+                self.n_bytes_sent += len(self.end_line)
+            writer.close()
+
+    # A method for removing the given subscriber
+    def unsubscribe(self, writer):
+        self.subscribers.discard(writer)
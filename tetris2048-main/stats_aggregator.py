@@ -0,0 +1,220 @@
+################################################################################
+#                                                                              #
+# Streaming statistics of many games in bounded memory, e.g. for batch runs    #
+# of headless games (the results of the games are not kept)                    #
+#                                                                              #
+################################################################################
+
+import argparse  # used for the command line options of the batch run
+import csv  # used for writing the snapshots as CSV files
+import json  # used for writing the snapshots as JSON Lines files
+import math  # used for the standard deviations
+import os  # used for checking whether a snapshot file is empty
+import random  # used for the random actions of the batch run
+from headless_game import HeadlessGame, ACTIONS  # used for the batch run
+
+# the metrics of a game (see get_game_metrics)
+METRICS = ["score", "highest_number", "lines_cleared", "merges", "game_length"]
+# the default quantiles computed for each metric
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+# A function that returns the metrics of a finished game on the given grid
+def get_game_metrics(game_grid):
+    return {"score": game_grid.score,
+            "highest_number": game_grid.get_peak_number(),
+            "lines_cleared": game_grid.n_lines_cleared,
+            "merges": game_grid.n_merges,
+            "game_length": game_grid.n_locked}
+
+
+# A class for estimating a quantile of a stream of values without storing the
+# values, by the P-square algorithm (Jain and Chlamtac, 1985): five markers are
+# moved towards the positions of the minimum, the p/2, p, (1+p)/2 quantiles
+# and the maximum, and their heights are adjusted by parabolic interpolation
+class P2Quantile:
+    # A constructor for creating an estimator of the quantile p (0 < p < 1)
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    # A method for adding the given value to the stream
+    def add(self, x):
+        q, n = self.heights, self.positions
+        # the first five values are the initial heights of the markers
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        # find the cell of the value and update the extreme heights
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        # move the middle markers that are off their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    # use linear interpolation if the parabola overshoots
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    # A method that returns the estimated quantile (None without any values)
+    def value(self):
+        q = self.heights
+        if not q:
+            return None
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+
+# A class for computing the count, mean, standard deviation, minimum, maximum,
+# quantiles and histogram of a stream of non-negative integer values. The
+# histogram has a bucket for each bit length of the values (0, 1, 2-3, 4-7,
+# 8-15, ...), so it has at most 65 buckets for 64-bit values and it is exact
+# for the powers of two such as the tile numbers.
+class RunningStats:
+    # A constructor for creating the statistics of an empty stream
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = None, None
+        self.quantiles = [P2Quantile(p) for p in quantiles]
+        self.histogram = []
+
+    # A method for adding the given value (Welford's algorithm for the mean
+    # and the variance)
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+        for quantile in self.quantiles:
+            quantile.add(x)
+        bucket = int(x).bit_length()
+        if bucket >= len(self.histogram):
+            self.histogram.extend([0] * (bucket + 1 - len(self.histogram)))
+        self.histogram[bucket] += 1
+
+    # A method that returns the statistics as a dictionary (the histogram maps
+    # the lowest value of each non-empty bucket to its count)
+    def get_summary(self):
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        summary = {"mean": self.mean, "std": std, "min": self.min, "max": self.max}
+        for quantile in self.quantiles:
+            summary["p" + format(quantile.p * 100, "g")] = quantile.value()
+        summary["histogram"] = {(1 << bucket >> 1): count for bucket, count
+                                in enumerate(self.histogram) if count}
+        return summary
+
+
+# A class for aggregating the metrics (see METRICS) of a stream of finished
+# games and writing snapshots of the statistics to a CSV or a JSON Lines file
+# (by the extension of the path: ".csv" for CSV, otherwise JSON Lines) after
+# every snapshot_interval games. The histograms are only written to the JSON
+# Lines files. The add_game method can be used as a game over listener of a
+# game grid (see GameGrid.game_over_listeners).
+class StatsAggregator:
+    # A constructor for creating an aggregator of the given quantiles that
+    # writes the snapshots to the given path (None: no snapshot files)
+    def __init__(self, path=None, snapshot_interval=1000,
+                 quantiles=DEFAULT_QUANTILES):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.n_games = 0
+        self.stats = {metric: RunningStats(quantiles) for metric in METRICS}
+
+    # A method for adding the metrics of the finished game on the given grid
+    def add_game(self, game_grid):
+        self.add(get_game_metrics(game_grid))
+
+    # A method for adding the given metrics of a finished game
+    def add(self, metrics):
+        self.n_games += 1
+        for metric in METRICS:
+            self.stats[metric].add(metrics[metric])
+        if self.path is not None and self.n_games % self.snapshot_interval == 0:
+            self.write_snapshot()
+
+    # A method that returns the current statistics as a dictionary
+    def get_snapshot(self):
+        snapshot = {"n_games": self.n_games}
+        for metric in METRICS:
+            snapshot[metric] = self.stats[metric].get_summary()
+        return snapshot
+
+    # A method for appending the current statistics to the snapshot file
+    def write_snapshot(self):
+        snapshot = self.get_snapshot()
+        if not self.path.endswith(".csv"):
+            with open(self.path, "a") as file:
+                file.write(json.dumps(snapshot) + "\n")
+            return
+        # a CSV row has a column for each statistic of each metric
+        row = {"n_games": self.n_games}
+        for metric in METRICS:
+            for name, value in snapshot[metric].items():
+                if name != "histogram":
+                    row[metric + "_" + name] = value
+        write_header = not os.path.exists(self.path) or \
+            os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(row))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+# A function for playing the given number of headless games with random
+# actions (one action per tick) and aggregating their statistics
+def run_batch(n_games, aggregator, seed=0):
+    rng = random.Random(seed)
+    for game_index in range(n_games):
+        game = HeadlessGame(seed=seed * n_games + game_index)
+        game.grid.game_over_listeners.append(aggregator.add_game)
+        while not game.game_over:
+            game.apply_action(rng.choice(ACTIONS))
+            game.tick()
+    return aggregator
+
+
+# A function for running a batch of games with the command line options
+def main():
+    parser = argparse.ArgumentParser(description="Tetris 2048 batch statistics")
+    parser.add_argument("n_games", type=int)
+    parser.add_argument("--output", default="stats.jsonl",
+                        help="the snapshot file (.csv or .jsonl)")
+    parser.add_argument("--interval", type=int, default=1000,
+                        help="the number of games between the snapshots")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+    aggregator = StatsAggregator(options.output, options.interval)
+    run_batch(options.n_games, aggregator, options.seed)
+    if aggregator.n_games % options.interval:
+        aggregator.write_snapshot()
+    print(json.dumps(aggregator.get_snapshot(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os  # used for the paths and the video driver of the tests
+import sys  # used for importing the game modules
+
+# the game modules are imported with flat imports (as in Tetris_2048.py) and
+# the tests do not open a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
@@ -0,0 +1,56 @@
+import os  # used for the paths of the recordings
+import threading  # used for holding up the encoder of the recorder
+import pygame  # used for the frames
+import pytest  # used for skipping the GIF test without Pillow
+from lib import recorder  # the module that is tested
+
+
+# A function that records n_frames frames of the given size to the given path
+# with a recorder whose encoder waits until all the frames are added, so that
+# its queue is more than half full and the frames are downsampled, and returns
+# the recorder and the sizes of the frames saved by its encoder
+def record_under_pressure(monkeypatch, path, n_frames, size, max_queue):
+    release = threading.Event()
+    save = pygame.image.save
+    saved_sizes = []
+
+    def slow_save(surface, file_name):
+        release.wait()
+        saved_sizes.append(surface.get_size())
+        save(surface, file_name)
+
+    monkeypatch.setattr(pygame.image, "save", slow_save)
+    rec = recorder.Recorder(path, maxQueue=max_queue)
+    surface = pygame.Surface(size)
+    for i in range(n_frames):
+        surface.fill((10 * i, 0, 255 - 10 * i))
+        rec.addFrame(surface)
+    release.set()
+    rec.close()
+    return rec, saved_sizes
+
+
+# A test that the PNG files keep the downsampled size of the frames added when
+# the queue is more than half full
+def test_png_frames_are_downsampled_under_pressure(monkeypatch, tmp_path):
+    path = str(tmp_path / "frames")
+    rec, saved_sizes = record_under_pressure(monkeypatch, path, 8, (64, 48), 8)
+    sizes = [pygame.image.load(os.path.join(path, name)).get_size()
+             for name in sorted(os.listdir(path))]
+    assert len(sizes) == rec.framesWritten() == 8
+    assert sizes == saved_sizes
+    assert sizes[0] == (64, 48) and (32, 24) in sizes
+
+
+# A test that all the frames of a GIF have the same size when some of them
+# are downsampled because the queue is more than half full
+def test_gif_frames_have_the_same_size_under_pressure(monkeypatch, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    path = str(tmp_path / "game.gif")
+    rec, saved_sizes = record_under_pressure(monkeypatch, path, 8, (64, 48), 8)
+    assert rec.framesWritten() == 8 and rec.framesDropped() == 0
+    # the frames are saved in the size of the first frame before they are
+    # encoded (Image.size of a GIF is its screen size for every frame)
+    assert saved_sizes == [(64, 48)] * 8
+    with Image.open(path) as image:
+        assert image.n_frames == 8 and image.size == (64, 48)
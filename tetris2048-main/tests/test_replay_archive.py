@@ -0,0 +1,103 @@
+import numpy as np  # used for comparing the exponent matrices
+import pytest  # used for the fixtures of the tests
+from headless_game import HeadlessGame  # the class of the direct replays
+from replay_archive import GameRecorder, ArchiveWriter, ReplayArchive
+from replay_archive import encode_state, restore_state  # the keyframe records
+from tile import Tile  # used for placing tiles on the grid
+
+# the seeds of the recorded games (the greedy policy loses the peak tile
+# before a keyframe in each of them), the number of ticks of each game and the
+# keyframe interval of the archive
+SEEDS = [0, 1, 17]
+N_TICKS = 300
+KEYFRAME_INTERVAL = 16
+
+
+# A function that plays the given game with the greedy policy by using the
+# given functions for applying an action and a tick (the game or a recorder)
+# and returns the action applied before each tick
+def play_greedy(game, apply_action, tick):
+    actions, n_tetrominoes, placement = [], None, None
+    while not game.game_over and game.n_ticks < N_TICKS:
+        if game.n_tetrominoes != n_tetrominoes:
+            n_tetrominoes = game.n_tetrominoes
+            placement = game.get_greedy_placement()
+        action = None if placement is None else game.get_action_toward(placement)
+        if action is not None:
+            apply_action(action)
+        tick()
+        actions.append(action)
+    return actions
+
+
+# A function that returns the game with the given seed replayed directly from
+# the given actions until the given tick
+def replay(seed, actions, tick):
+    game = HeadlessGame(seed=seed)
+    for action in actions[:tick]:
+        if action is not None:
+            game.apply_action(action)
+        game.tick()
+    return game
+
+
+# A fixture that records the games into an archive and returns its path and
+# the actions of each game
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("archive") / "games.t2048")
+    writer = ArchiveWriter(path, keyframe_interval=KEYFRAME_INTERVAL)
+    actions = []
+    for seed in SEEDS:
+        recorder = GameRecorder(seed, keyframe_interval=KEYFRAME_INTERVAL)
+        actions.append(play_greedy(recorder.game, recorder.apply_action,
+                                   recorder.tick))
+        writer.add_game(recorder)
+    writer.close()
+    return path, actions
+
+
+# A function that checks that the given games are in the same state
+def assert_same_state(loaded, direct):
+    assert np.array_equal(loaded.grid.get_exponent_matrix(),
+                          direct.grid.get_exponent_matrix())
+    assert loaded.grid.score == direct.grid.score
+    assert loaded.grid.get_peak_number() == direct.grid.get_peak_number()
+    assert loaded.grid.deferred_merge_cells == direct.grid.deferred_merge_cells
+    assert loaded.grid.n_lines_cleared == direct.grid.n_lines_cleared
+    assert loaded.grid.n_floating_removed == direct.grid.n_floating_removed
+    assert loaded.game_over == direct.game_over
+
+
+# A test for loading the games at every keyframe and between the keyframes
+def test_loaded_game_matches_direct_replay(archive):
+    path, actions = archive
+    replay_archive = ReplayArchive(path)
+    n_lost_peaks = 0
+    try:
+        for game_index, seed in enumerate(SEEDS):
+            n_ticks = replay_archive.get_game_info(game_index)["n_ticks"]
+            for tick in range(0, n_ticks + 1, KEYFRAME_INTERVAL // 2):
+                direct = replay(seed, actions[game_index], tick)
+                assert_same_state(replay_archive.load_game(game_index, tick),
+                                  direct)
+                grid = direct.grid
+                n_lost_peaks += grid.peak_exponent > grid.exponent_matrix.max()
+    finally:
+        replay_archive.close()
+    # the peak must come from the keyframe, not from the restored tiles
+    assert n_lost_peaks > 0
+
+
+# A test for the round trip of a keyframe record with the cells deferred to the
+# next merge pass and a peak that is not on the grid anymore
+def test_keyframe_round_trip():
+    game = HeadlessGame(seed=5)
+    game.grid.set_tile(0, 0, Tile(8))
+    game.grid.set_tile(0, 1, Tile(2))
+    game.grid.peak_exponent = 6
+    game.grid.deferred_merge_cells = {1, 21}
+    restored = HeadlessGame(seed=5)
+    restore_state(restored, encode_state(game), 0, 0)
+    assert_same_state(restored, game)
+    assert restored.grid.get_peak_number() == 64
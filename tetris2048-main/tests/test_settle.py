@@ -0,0 +1,136 @@
+import random  # used for creating the tetromino of the lock test
+import simulation  # used for checking that the board states apply the same rules
+from game_grid import GameGrid  # the class whose rules are tested
+from tetromino import Tetromino  # used for locking a tetromino
+from tile import Tile  # used for the tiles of the boards
+
+# The boards of the tests are given as lists of rows of tile numbers from the
+# top row to the bottom row (0 for an empty cell), and the expected boards
+# after GameGrid.settle are given the same way. The rules are applied in the
+# order full rows -> merge -> floating tiles -> full rows, repeated until
+# nothing changes.
+
+
+# A function that returns a game grid with the given board (see above)
+def make_grid(board):
+    grid = GameGrid(len(board), len(board[0]))
+    for row, numbers in enumerate(reversed(board)):
+        for col, number in enumerate(numbers):
+            if number:
+                grid.set_tile(row, col, Tile(number))
+    return grid
+
+
+# A function that returns the board of the given game grid (see above)
+def get_board(grid):
+    return [[0 if tile is None else tile.number for tile in row]
+            for row in reversed(grid.tile_matrix.tolist())]
+
+
+# A function that settles the given board on a game grid and on a board state
+# and returns the game grid after checking that both give the same result
+def settle(board):
+    grid = make_grid(board)
+    state = simulation.from_grid(grid)
+    grid.settle()
+    state.settle()
+    assert state.cells == grid.get_exponent_matrix().tolist()
+    assert state.score == grid.score
+    return grid
+
+
+# A test where a full row is cleared before the equal tiles in it are merged
+# (merging first would break the row, and it would never be cleared)
+def test_full_row_is_cleared_before_merging():
+    grid = settle([[0, 0, 0, 0],
+                   [0, 0, 0, 0],
+                   [0, 0, 0, 0],
+                   [8, 8, 2, 8],
+                   [0, 16, 2, 16]])
+    assert get_board(grid) == [[0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 16, 2, 16]]
+    assert grid.score == 8 + 8 + 2 + 8
+    assert grid.n_lines_cleared == 1
+    assert grid.n_merges == 0
+
+
+# A test where a merge moves a tile down into the gap of a row, the completed
+# row is cleared in the same settle
+def test_merge_completes_a_row():
+    grid = settle([[0, 0, 0, 0],
+                   [0, 0, 0, 0],
+                   [0, 0, 32, 0],
+                   [64, 8, 0, 8],
+                   [0, 16, 2, 16],
+                   [0, 8, 2, 8]])
+    # 2 + 2 = 4, then the 32 moves down and completes the row of the 64
+    assert get_board(grid) == [[0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 16, 0, 16],
+                               [0, 8, 4, 8]]
+    assert grid.score == 4 + (64 + 8 + 32 + 8)
+    assert grid.n_merges == 1
+    assert grid.n_lines_cleared == 1
+
+
+# A test where clearing a full row leaves tiles that are not connected to the
+# bottom row anymore, which are removed as floating tiles
+def test_row_clear_leaves_floating_tiles():
+    grid = settle([[0, 0, 0, 0],
+                   [0, 0, 64, 128],
+                   [4, 8, 16, 32],
+                   [2, 0, 0, 0]])
+    assert get_board(grid) == [[0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [2, 0, 0, 0]]
+    assert grid.score == (4 + 8 + 16 + 32) + (64 + 128)
+    assert grid.n_lines_cleared == 1
+    assert grid.n_floating_removed == 2
+
+
+# A test where merging the tiles of a column moves the tile that holds the
+# tiles next to it, which are removed as floating tiles (a single tile without
+# any neighbors would fall down instead, see Tile.merge_tiles)
+def test_merge_leaves_floating_tiles():
+    grid = settle([[0, 0, 0, 128],
+                   [0, 0, 16, 32],
+                   [0, 0, 4, 0],
+                   [0, 0, 4, 0],
+                   [2, 0, 8, 0]])
+    # 4 + 4 = 8 moves the 16 down, so the 32 and the 128 are floating, then
+    # 8 + 8 = 16 and 16 + 16 = 32
+    assert get_board(grid) == [[0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [0, 0, 0, 0],
+                               [2, 0, 32, 0]]
+    assert grid.score == 8 + (32 + 128) + 16 + 32
+    assert grid.n_merges == 3
+    assert grid.n_floating_removed == 2
+
+
+# A test where a locked tetromino completes two rows that would be broken by
+# merging its own tiles first
+def test_lock_clears_the_completed_rows_first():
+    grid = make_grid([[0, 0, 0, 0],
+                      [0, 0, 0, 0],
+                      [0, 0, 0, 0],
+                      [0, 0, 32, 64],
+                      [0, 0, 8, 16]])
+    Tetromino.grid_height, Tetromino.grid_width = 5, 4
+    tetromino = Tetromino('O', random.Random(0))
+    for tile in tetromino.tiles:
+        tile.number = 2
+    # move the tetromino to the bottom left corner
+    tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y = 0, 0
+    assert not grid.lock_tetromino(tetromino)
+    assert get_board(grid) == [[0] * 4 for _ in range(5)]
+    assert grid.score == 4 * 2 + 8 + 16 + 32 + 64
+    assert grid.n_lines_cleared == 2
+    assert grid.n_merges == 0
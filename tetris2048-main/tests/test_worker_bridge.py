@@ -0,0 +1,56 @@
+import time  # used for waiting for the worker
+import pytest  # used for the fixtures of the tests
+from worker_bridge import WorkerBridge  # the class that is tested
+
+
+# A function that polls the given bridge for the given key until the posted
+# computation is done (or a second has passed) and returns the result
+def wait_for_result(bridge, key):
+    deadline = time.perf_counter() + 1
+    while bridge.future is not None and time.perf_counter() < deadline:
+        bridge.poll(key)
+        time.sleep(0.001)
+    return bridge.poll(key)
+
+
+# A fixture that creates a bridge for the compute function given by the test
+# and closes it after the test
+@pytest.fixture
+def make_bridge():
+    bridges = []
+
+    def make(compute):
+        bridges.append(WorkerBridge(compute))
+        return bridges[-1]
+
+    yield make
+    for bridge in bridges:
+        bridge.close()
+
+
+# A test that the result of a computation is returned for its key only
+def test_poll_returns_the_result_for_the_posted_key(make_bridge):
+    bridge = make_bridge(lambda x, cancelled: x * 2)
+    bridge.post(1, 21)
+    assert wait_for_result(bridge, 1) == 42
+    assert bridge.poll(2) is None
+    assert bridge.key is None
+
+
+# A test that an exception raised by the computation is not raised by poll:
+# there is no result, the exception is kept and the bridge can be used again
+def test_poll_does_not_raise_the_errors_of_the_computation(make_bridge):
+    def compute(x, cancelled):
+        if x < 0:
+            raise ValueError("negative")
+        return x
+
+    bridge = make_bridge(compute)
+    bridge.post(1, -1)
+    assert wait_for_result(bridge, 1) is None
+    assert isinstance(bridge.error, ValueError)
+    assert bridge.n_failed == 1
+    # the failed computation is not retried for the same key
+    assert bridge.poll(1) is None and bridge.n_failed == 1
+    bridge.post(2, 5)
+    assert wait_for_result(bridge, 2) == 5
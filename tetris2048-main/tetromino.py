@@ -1,8 +1,151 @@
 from tile import Tile  # used for modeling each tile on the tetrominoes
 from point import Point  # used for tile positions
-import copy as cp  # the copy module is used for copying tiles and positions
 import random  # the random module is used for generating random values
 import numpy as np  # the fundamental Python module for scientific computing
+from collections import namedtuple  # used for representing the placements
+
+# A final resting placement of a tetromino on the game grid: rotation is the
+# number of clockwise rotations from the current rotation state, (col, row) is
+# the grid position of the bottom left corner of the minimal bounding box of
+# the tiles, and cells is a tuple of (dx, dy, number) values giving the offset
+# of each tile from this corner (dy grows upwards) and the number on it
+Placement = namedtuple("Placement", ["rotation", "col", "row", "cells"])
+
+
+# A function that returns the placements (as a list of Placement objects) of a
+# tetromino with the given rotation states (see Tetromino.get_rotation_states)
+# dropped straight down onto a grid with the given column heights and number of
+# rows (the placements that do not fit in the grid are omitted)
+def find_placements(heights, grid_height, rotation_states):
+    placements = []
+    for rotation, cells in rotation_states:
+        width = max(dx for dx, dy, number in cells) + 1
+        height = max(dy for dx, dy, number in cells) + 1
+        # the lowest tile offset in each column of the tetromino
+        bottoms = [min(dy for dx, dy, number in cells if dx == col)
+                   for col in range(width)]
+        for col in range(len(heights) - width + 1):
+            # the tetromino lands on the highest column below its tiles
+            row = max(heights[col + dx] - bottoms[dx] for dx in range(width))
+            if row + height <= grid_height:
+                placements.append(Placement(rotation, col, row, cells))
+    return placements
+
+
+# The shapes of the tetrominoes in their initial rotation states: for each type,
+# n = number of rows = number of columns in the tile matrix and the occupied
+# (non-empty) cells of the tile matrix as (column_index, row_index) values
+SHAPES = {
+    'I': (4, [(1, 0), (1, 1), (1, 2), (1, 3)]),
+    'O': (2, [(0, 0), (1, 0), (0, 1), (1, 1)]),
+    'Z': (3, [(0, 1), (1, 1), (1, 2), (2, 2)]),
+    'T': (3, [(0, 1), (1, 1), (2, 1), (1, 2)]),
+    'L': (3, [(0, 1), (1, 1), (2, 1), (2, 0)]),
+    'J': (3, [(0, 1), (1, 1), (2, 1), (0, 0)]),
+    'S': (3, [(0, 2), (1, 2), (1, 1), (2, 1)]),
+}
+# the types of the tetrominoes in the order used for choosing a random type and
+# for encoding the type as a number (the replay archives, the observations and
+# the Zobrist keys), so this order must not change
+TETROMINO_TYPES = ('I', 'O', 'Z', 'S', 'T', 'J', 'L')
+
+
+# The metadata of a rotation state of a shape (computed once by register_shape):
+#   cells: the (row_index, col_index) cells of the tile matrix, the tile on the
+#       i-th cell of the shape (see register_shape) is on the i-th cell in
+#       every state
+#   matrix_cells: the (row_index, col_index, i) values of the cells in the
+#       order of the rows and the columns of the tile matrix
+#   offsets: the (dx, dy) offset of each cell (in the order of cells) from the
+#       bottom left corner of the bounding box of the cells (dy grows upwards)
+#   bbox: the (min_row, max_row, min_col, max_col) indexes of the bounding box
+#       in the tile matrix, width and height: the size of the bounding box
+#   row_masks: for each dy, the bits of the dx values of the cells in the row
+#   lefts and rights: for each dy, the lowest and the highest dx in the row
+#   bottoms: for each dx, the lowest dy in the column
+ShapeRotation = namedtuple("ShapeRotation", [
+    "cells", "matrix_cells", "offsets", "bbox", "width", "height", "row_masks",
+    "lefts", "rights", "bottoms"])
+# The metadata of a shape: its name, the size n of its n x n tile matrix, its
+# four rotation states (the i-th state is i clockwise rotations from the
+# initial state), the rotation state of each set of occupied cells (as a
+# frozenset of (row_index, col_index) values) and the spawn extents: the
+# lowest and the highest column offset of a tile from the bottom left cell of
+# the tile matrix in the initial state (a tetromino spawns with its bottom left
+# cell in the columns from 0 to grid_width - n)
+ShapeInfo = namedtuple("ShapeInfo", ["name", "n", "rotations",
+                                     "rotation_by_cells", "spawn_extents"])
+# the registered shapes by their names (see register_shape)
+SHAPE_REGISTRY = {}
+
+
+# A function that computes the metadata of the rotation state with the given
+# occupied (row_index, col_index) cells
+def _get_shape_rotation(cells):
+    min_row = min(row for row, col in cells)
+    max_row = max(row for row, col in cells)
+    min_col = min(col for row, col in cells)
+    max_col = max(col for row, col in cells)
+    width, height = max_col - min_col + 1, max_row - min_row + 1
+    offsets = tuple((col - min_col, max_row - row) for row, col in cells)
+    row_masks = [0] * height
+    for dx, dy in offsets:
+        row_masks[dy] |= 1 << dx
+    return ShapeRotation(
+        cells=tuple(cells),
+        matrix_cells=tuple(sorted((row, col, i) for i, (row, col) in enumerate(cells))),
+        offsets=offsets, bbox=(min_row, max_row, min_col, max_col),
+        width=width, height=height, row_masks=tuple(row_masks),
+        lefts=tuple((mask & -mask).bit_length() - 1 for mask in row_masks),
+        rights=tuple(mask.bit_length() - 1 for mask in row_masks),
+        bottoms=tuple(min(dy for dx, dy in offsets if dx == col)
+                      for col in range(width)))
+
+
+# A function for registering a shape with the given name, the size n of its
+# n x n tile matrix and the occupied (column_index, row_index) cells of its
+# initial rotation state (as in SHAPES), e.g. for a custom set of pieces such
+# as the pentominoes. The metadata of the shape are computed once here, so
+# creating, moving, rotating and locking a tetromino of the shape only looks
+# them up. A custom shape is only added to SHAPE_REGISTRY: SHAPES and
+# TETROMINO_TYPES keep the standard tetrominoes, which are the only types
+# chosen by the games and the rollouts and known to the replay archives and
+# the Zobrist keys.
+def register_shape(name, n, cells):
+    cells = [(row, col) for col, row in cells]
+    rotations = []
+    rotation_by_cells = {}
+    for rotation in range(4):
+        rotations.append(_get_shape_rotation(cells))
+        rotation_by_cells.setdefault(frozenset(cells), rotation)
+        # rotate the cells by 90 degrees clockwise (as in rotate_cw)
+        cells = [(col, n - 1 - row) for row, col in cells]
+    bbox = rotations[0].bbox
+    SHAPE_REGISTRY[name] = ShapeInfo(name, n, tuple(rotations), rotation_by_cells,
+                                     (bbox[2], bbox[3]))
+    return SHAPE_REGISTRY[name]
+
+
+for _name, (_n, _cells) in SHAPES.items():
+    register_shape(_name, _n, _cells)
+
+
+# A function that returns the rotation states (see
+# Tetromino.get_rotation_states) of a tetromino of the given type in the given
+# rotation state (0 for the initial state) with the given numbers on its tiles
+# (in the order of the cells of the shape)
+def get_shape_rotation_states(shape, numbers, rotation=0):
+    rotations = SHAPE_REGISTRY[shape].rotations
+    states, seen = [], set()
+    for turns in range(4):
+        offsets = tuple(sorted((dx, dy, number) for (dx, dy), number in
+                               zip(rotations[(rotation + turns) % 4].offsets, numbers)))
+        # rotation states with the same tiles at the same offsets result in
+        # the same placements
+        if offsets not in seen:
+            seen.add(offsets)
+            states.append((turns, offsets))
+    return states
 
 
 # A class for modeling tetrominoes with 3 out of 7 different types as I, O and Z
@@ -10,75 +153,50 @@ class Tetromino:
     # the dimensions of the game grid (defined as class variables)
     grid_height, grid_width = None, None
 
-    # A constructor for creating a tetromino with a given shape (type)
-    def __init__(self, shape):
+    # A constructor for creating a tetromino with a given shape (type), the
+    # numbers on its tiles and its position are chosen by the given random
+    # number generator (the random module by default, or e.g. a seeded
+    # random.Random object for a reproducible game)
+    def __init__(self, shape, rng=random):
         self.type = shape  # set the type of this tetromino
-        # determine the occupied (non-empty) cells in the tile matrix based on
-        # the shape of this tetromino (see the documentation given with this code)
-        occupied_cells = []
-        if self.type == 'I':
-            n = 4  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino I in its initial rotation state
-            occupied_cells.append((1, 0))  # (column_index, row_index)
-            occupied_cells.append((1, 1))
-            occupied_cells.append((1, 2))
-            occupied_cells.append((1, 3))
-        elif self.type == 'O':
-            n = 2  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino O in its initial rotation state
-            occupied_cells.append((0, 0))  # (column_index, row_index)
-            occupied_cells.append((1, 0))
-            occupied_cells.append((0, 1))
-            occupied_cells.append((1, 1))
-        elif self.type == 'Z':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino Z in its initial rotation state
-            occupied_cells.append((0, 1))  # (column_index, row_index)
-            occupied_cells.append((1, 1))
-            occupied_cells.append((1, 2))
-            occupied_cells.append((2, 2))
-
-        elif self.type == 'T':
-            n = 3
-            occupied_cells.append((0, 1))
-            occupied_cells.append((1, 1))
-            occupied_cells.append((2, 1))
-            occupied_cells.append((1, 2))
-
-        elif self.type == 'L':
-            n = 3
-            occupied_cells.append((0, 1))
-            occupied_cells.append((1, 1))
-            occupied_cells.append((2, 1))
-            occupied_cells.append((2, 0))
-
-        elif self.type == 'J':
-            n = 3
-            occupied_cells.append((0, 1))
-            occupied_cells.append((1, 1))
-            occupied_cells.append((2, 1))
-            occupied_cells.append((0, 0))
-
-        elif self.type == 'S':
-            n = 3
-            occupied_cells.append((0, 2))
-            occupied_cells.append((1, 2))
-            occupied_cells.append((1, 1))
-            occupied_cells.append((2, 1))
-
-        # create a matrix of numbered tiles based on the shape of this tetromino
-        self.tile_matrix = np.full((n, n), None)
-        # create the four tiles (minos) of this tetromino and place these tiles
-        # into the tile matrix
-        for i in range(len(occupied_cells)):
-            col_index, row_index = occupied_cells[i][0], occupied_cells[i][1]
-            # create a tile for each occupied cell of this tetromino
-            self.tile_matrix[row_index][col_index] = Tile()
+        # the precomputed metadata of the shape (see register_shape)
+        self.shape_info = SHAPE_REGISTRY[shape]
+        n = self.shape_info.n  # n = number of rows = number of columns
+        # create the tiles (minos) of this tetromino in the order of the cells
+        # of the shape, a tile stays on the same cell of the shape when this
+        # tetromino is rotated
+        self.tiles = [Tile(rng.choice([2, 4])) for _ in self.shape_info.rotations[0].cells]
+        # place the tiles into the tile matrix in the initial rotation state
+        self._set_rotation(0)
         # initialize the position of this tetromino (as the bottom left cell in
         # the tile matrix) with a random horizontal position above the game grid
         self.bottom_left_cell = Point()
         self.bottom_left_cell.y = Tetromino.grid_height - 1
-        self.bottom_left_cell.x = random.randint(0, Tetromino.grid_width - n)
+        self.bottom_left_cell.x = rng.randint(0, Tetromino.grid_width - n)
+
+    # A method for placing the tiles of this tetromino into a new tile matrix
+    # in the given rotation state (the tiles are moved, not copied)
+    def _set_rotation(self, rotation):
+        n = self.shape_info.n  # n = number of rows = number of columns
+        self.rotation = rotation
+        self.tile_matrix = np.full((n, n), None)
+        for (row, col), tile in zip(self.shape_info.rotations[rotation].cells, self.tiles):
+            self.tile_matrix[row][col] = tile
+
+    # A method for replacing the tile matrix of this tetromino with the given
+    # n x n tile matrix (e.g. a restored tetromino), which must contain the
+    # tiles of the shape of this tetromino in one of its rotation states
+    def set_tile_matrix(self, tile_matrix):
+        cells = frozenset((row, col) for row in range(len(tile_matrix))
+                          for col in range(len(tile_matrix))
+                          if tile_matrix[row][col] is not None)
+        rotation = self.shape_info.rotation_by_cells.get(cells)
+        if rotation is None:
+            raise ValueError("the tile matrix is not a rotation state of " + self.type)
+        self.rotation = rotation
+        self.tiles = [tile_matrix[row][col]
+                      for row, col in self.shape_info.rotations[rotation].cells]
+        self.tile_matrix = tile_matrix
 
     # A method that computes and returns the position of the cell in the tile
     # matrix specified by the given row and column indexes
@@ -91,53 +209,44 @@ class Tetromino:
         position.y = self.bottom_left_cell.y + (n - 1) - row
         return position
 
+    # A method that yields the (row, col, x, y) values of each occupied cell of
+    # the tile matrix: its indexes in the tile matrix and its position on the
+    # game grid (computed without creating a Point object for each cell)
+    def get_cell_positions(self):
+        n = self.shape_info.n  # n = number of rows = number of columns
+        x, top_y = self.bottom_left_cell.x, self.bottom_left_cell.y + (n - 1)
+        for row, col, _ in self.shape_info.rotations[self.rotation].matrix_cells:
+            yield row, col, x + col, top_y - row
+
     # A method to return a copy of the tile matrix without any empty row/column,
     # and the position of the bottom left cell when return_position is set
     def get_min_bounded_tile_matrix(self, return_position=False):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        # determine rows and columns to copy (omit empty rows and columns)
-        min_row, max_row, min_col, max_col = n - 1, 0, n - 1, 0
-        for row in range(n):
-            for col in range(n):
-                if self.tile_matrix[row][col] is not None:
-                    if row < min_row:
-                        min_row = row
-                    if row > max_row:
-                        max_row = row
-                    if col < min_col:
-                        min_col = col
-                    if col > max_col:
-                        max_col = col
-        # copy the tiles from the tile matrix of this tetromino
-        copy = np.full((max_row - min_row + 1, max_col - min_col + 1), None)
-        for row in range(min_row, max_row + 1):
-            for col in range(min_col, max_col + 1):
-                if self.tile_matrix[row][col] is not None:
-                    row_ind = row - min_row
-                    col_ind = col - min_col
-                    copy[row_ind][col_ind] = cp.deepcopy(self.tile_matrix[row][col])
+        n = self.shape_info.n  # n = number of rows = number of columns
+        state = self.shape_info.rotations[self.rotation]
+        # the rows and columns to copy (without empty rows and columns)
+        min_row, max_row, min_col, max_col = state.bbox
+        # copy the tiles of this tetromino as new tiles with the same numbers
+        # (the tiles of this tetromino are not shared with the game grid)
+        copy = np.full((state.height, state.width), None)
+        for (row, col), tile in zip(state.cells, self.tiles):
+            copy[row - min_row][col - min_col] = Tile(tile.number)
         # return just the matrix copy when return_position is not set (as True)
         # the argument return_position defaults to False when a value is not given
         if not return_position:
             return copy
         # otherwise return the position of the bottom left cell in copy as well
         else:
-            blc_position = cp.copy(self.bottom_left_cell)
-            blc_position.translate(min_col, (n - 1) - max_row)
+            blc_position = Point(self.bottom_left_cell.x + min_col,
+                                 self.bottom_left_cell.y + (n - 1) - max_row)
             return copy, blc_position
 
     # A method for drawing the tetromino on the game grid
     def draw(self):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        for row in range(n):
-            for col in range(n):
-                # draw each occupied cell as a tile on the game grid
-                if self.tile_matrix[row][col] is not None:
-                    # get the position of the tile
-                    position = self.get_cell_position(row, col)
-                    # draw only the tiles that are inside the game grid
-                    if position.y < Tetromino.grid_height:
-                        self.tile_matrix[row][col].draw(position)
+        # draw each occupied cell as a tile on the game grid
+        for row, col, x, y in self.get_cell_positions():
+            # draw only the tiles that are inside the game grid
+            if y < Tetromino.grid_height:
+                self.tile_matrix[row][col].draw_at(x, y)
 
     # A method for moving this tetromino in a given direction by 1 on the grid
     def move(self, direction, game_grid):
@@ -155,118 +264,65 @@ class Tetromino:
         return True  # a successful move in the given direction
 
     # A method for checking if this tetromino can be moved in a given direction
+    # (only the leftmost/rightmost tile of each row or the bottommost tile of
+    # each column is checked, as given by the metadata of the rotation state)
     def can_be_moved(self, direction, game_grid):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        # check for moving left or right
-        if direction == "left" or direction == "right":
-            for row_index in range(n):
-                for col_index in range(n):
-                    # direction = left --> check the leftmost tile of each row
-                    row, col = row_index, col_index
-                    if direction == "left" and self.tile_matrix[row][col] is not None:
-                        # the position of the leftmost tile of the current row
-                        leftmost = self.get_cell_position(row, col)
-                        # if any leftmost tile is at x = 0
-                        if leftmost.x == 0:
-                            return False  # this tetromino cannot be moved left
-                        # if the grid cell on the left of a leftmost tile is occupied
-                        if game_grid.is_occupied(leftmost.y, leftmost.x - 1):
-                            return False  # this tetromino cannot be moved left
-                        # as the leftmost tile of the current row is checked
-                        break  # end the inner for loop
-                    # direction = right --> check the rightmost tile of each row
-                    row, col = row_index, n - 1 - col_index
-                    if direction == "right" and self.tile_matrix[row][col] is not None:
-                        # the position of the rightmost tile of the current row
-                        rightmost = self.get_cell_position(row, col)
-                        # if any rightmost tile is at x = grid_width - 1
-                        if rightmost.x == Tetromino.grid_width - 1:
-                            return False  # this tetromino cannot be moved right
-                        # if the grid cell on the right of a rightmost tile is occupied
-                        if game_grid.is_occupied(rightmost.y, rightmost.x + 1):
-                            return False  # this tetromino cannot be moved right
-                        # as the rightmost tile of the current row is checked
-                        break  # end the inner for loop
+        n = self.shape_info.n  # n = number of rows = number of columns
+        state = self.shape_info.rotations[self.rotation]
+        min_row, max_row, min_col, max_col = state.bbox
+        # the position of the bottom left corner of the bounding box of the tiles
+        left_x = self.bottom_left_cell.x + min_col
+        bottom_y = self.bottom_left_cell.y + (n - 1) - max_row
+        # direction = left --> check the leftmost tile of each row
+        if direction == "left":
+            for dy, dx in enumerate(state.lefts):
+                x, y = left_x + dx, bottom_y + dy
+                # if any leftmost tile is at x = 0 or the grid cell on its left
+                # is occupied
+                if x == 0 or game_grid.is_occupied(y, x - 1):
+                    return False  # this tetromino cannot be moved left
+        # direction = right --> check the rightmost tile of each row
+        elif direction == "right":
+            for dy, dx in enumerate(state.rights):
+                x, y = left_x + dx, bottom_y + dy
+                # if any rightmost tile is at x = grid_width - 1 or the grid
+                # cell on its right is occupied
+                if x == Tetromino.grid_width - 1 or game_grid.is_occupied(y, x + 1):
+                    return False  # this tetromino cannot be moved right
         # direction = down --> check the bottommost tile of each column
         else:
-            for col in range(n):
-                for row in range(n - 1, -1, -1):
-                    # if the current cell of the tetromino is occupied by a tile
-                    if self.tile_matrix[row][col] is not None:
-                        # the position of the bottommost tile of the current col
-                        bottommost = self.get_cell_position(row, col)
-                        # if any bottommost tile is at y = 0
-                        if bottommost.y == 0:
-                            return False  # this tetromino cannot be moved down
-                        # if the grid cell below any bottommost tile is occupied
-                        if game_grid.is_occupied(bottommost.y - 1, bottommost.x):
-                            return False  # this tetromino cannot be moved down
-                        # as the bottommost tile of the current row is checked
-                        break  # end the inner for loop
+            for dx, dy in enumerate(state.bottoms):
+                x, y = left_x + dx, bottom_y + dy
+                # if any bottommost tile is at y = 0 or the grid cell below it
+                # is occupied
+                if y == 0 or game_grid.is_occupied(y - 1, x):
+                    return False  # this tetromino cannot be moved down
         # if this method does not end by returning False before this line
         return True  # this tetromino can be moved in the given direction
 
-        # A method for rotating this tetromino by 90 degrees clockwise
-
-    def rotate_cw(self, game_grid):
-
-        n = len(self.tile_matrix)
-
-        # create a new matrix to store the rotated tetromino
-        rotated_matrix = np.full((n, n), None)
-
-        # rotate the tetromino by 90 degrees clockwise
-        for row in range(n):
-            for col in range(n):
-                if self.tile_matrix[row][col] is not None:
-                    rotated_matrix[col][n - 1 - row] = cp.deepcopy(self.tile_matrix[row][col])
-
-        # check if the rotated tetromino can be placed on the grid
-        if not self.can_be_placed(rotated_matrix, game_grid):
-            return False
-
-        # update the tile matrix of this tetromino with the rotated matrix
-        self.tile_matrix = rotated_matrix
+    # A method for rotating this tetromino by n_turns x 90 degrees clockwise
+    # when all its tiles are inside the grid and on empty cells after the
+    # rotation, returns True if this tetromino is rotated
+    def rotate(self, n_turns, game_grid):
+        rotation = (self.rotation + n_turns) % 4
+        n = self.shape_info.n  # n = number of rows = number of columns
+        left_x, top_y = self.bottom_left_cell.x, self.bottom_left_cell.y + (n - 1)
+        for row, col in self.shape_info.rotations[rotation].cells:
+            x, y = left_x + col, top_y - row
+            # check if the rotated tetromino is inside the grid and does not
+            # overlap with any occupied cell
+            if not game_grid.is_inside(y, x) or game_grid.is_occupied(y, x):
+                return False
+        self._set_rotation(rotation)
         return True
 
-        # A method for checking if the rotated tetromino can be placed on the grid
-
-    def can_be_placed(self, rotated_matrix, game_grid):
-        n = len(rotated_matrix)
-
-        # check if the rotated tetromino can be placed on the grid
-        for row in range(n):
-            for col in range(n):
-                if rotated_matrix[row][col] is not None:
-                    position = self.get_cell_position(row, col)
-
-                    # check if the rotated tetromino is inside the grid
-                    if not game_grid.is_inside(position.y, position.x):
-                        return False
-
-                    # check if the rotated tetromino overlaps with any occupied cell
-                    if game_grid.is_occupied(position.y, position.x):
-                        return False
-
-        return True
-
-        # A method for rotating this tetromino by 90 degrees counter clockwise
+    # A method for rotating this tetromino by 90 degrees clockwise
+    def rotate_cw(self, game_grid):
+        return self.rotate(1, game_grid)
 
+    # A method for rotating this tetromino by 90 degrees counter clockwise
     def rotate_ccw(self, game_grid):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        # create a new matrix to store the rotated tetromino
-        rotated_matrix = np.full((n, n), None)
-        # rotate the tetromino by 90 degrees clockwise
-        for row in range(n):
-            for col in range(n):
-                if self.tile_matrix[row][col] is not None:
-                    rotated_matrix[n - 1 - col][row] = cp.deepcopy(self.tile_matrix[row][col])
-        # check if the rotated tetromino can be placed on the grid
-        if not self.can_be_placed(rotated_matrix, game_grid):
-            return False
-        # update the tile matrix of this tetromino with the rotated matrix
-        self.tile_matrix = rotated_matrix
-        return True
+        return self.rotate(3, game_grid)
 
         # method for hard dropping the tetromino
 
@@ -278,13 +334,31 @@ class Tetromino:
         # Initialize the highest number to 0
         highest_number = 0
 
-        # Iterate over the tile_matrix
-        for row in self.tile_matrix:
-            for tile in row:
-                # If the tile is not None and its number is higher than the current highest number
-                if tile is not None and tile.number > highest_number:
-                    # Update the highest number
-                    highest_number = tile.number
+        # Iterate over the tiles
+        for tile in self.tiles:
+            # If its number is higher than the current highest number
+            if tile.number > highest_number:
+                # Update the highest number
+                highest_number = tile.number
 
         # Return the highest number
         return highest_number
+
+    # A method that returns the distinct rotation states of this tetromino
+    # as a list of (rotation, cells) tuples, where rotation is the number of
+    # clockwise rotations from the current state and cells is a sorted tuple
+    # of (dx, dy, number) values as in Placement
+    def get_rotation_states(self):
+        return get_shape_rotation_states(
+            self.type, [tile.number for tile in self.tiles], self.rotation)
+
+    # A method for moving this tetromino to the given placement (as returned by
+    # GameGrid.get_placements) without checking for collisions on the way
+    def apply_placement(self, placement):
+        n = self.shape_info.n  # n = number of rows = number of columns
+        self._set_rotation((self.rotation + placement.rotation) % 4)
+        # the bounding box of the tiles in the rotated tile matrix
+        min_row, max_row, min_col, max_col = \
+            self.shape_info.rotations[self.rotation].bbox
+        self.bottom_left_cell.x = placement.col - min_col
+        self.bottom_left_cell.y = placement.row - (n - 1 - max_row)
@@ -1,11 +1,139 @@
 import lib.stddraw as stddraw  # used for drawing the tiles to display them
 from constants import BACKGROUND_COLOR, FOREGROUND_COLOR # used for coloring the tiles
-from lib.color import Color  # used for coloring the tiles
+from lib.color import Color, GRAY  # used for coloring the tiles
 import random  # used for randomly choosing the number on the tile
+import heapq  # used for the worklist of the cells to check for merging
+import colorsys  # used for generating the colors of the numbers beyond 2048
+import pygame  # used for the pre-rendered tiles (sprites)
+
+# the colors of the labels that are used for the generated tile colors (the
+# one with the higher contrast on the background color is chosen)
+_DARK_FOREGROUND, _LIGHT_FOREGROUND = Color(138, 129, 120), Color(249, 246, 242)
+# the color of the tile boundaries
+BOUNDARY_COLOR = GRAY
+# the (background, foreground) colors of each exponent of the tile numbers
+_tile_colors = {}
+# the pre-rendered tiles for each (exponent, width, height) in pixels
+_tile_sprites = {}
+
+
+# A function that returns the (r, g, b) tuple of the given Color object
+def _rgb(color):
+    return color.getRed(), color.getGreen(), color.getBlue()
+
+
+# A function that returns the relative luminance of the given color (WCAG)
+def _get_luminance(color):
+    channels = []
+    for value in _rgb(color):
+        value /= 255
+        channels.append(value / 12.92 if value <= 0.03928
+                        else ((value + 0.055) / 1.055) ** 2.4)
+    return 0.2126 * channels[0] + 0.7152 * channels[1] + 0.0722 * channels[2]
+
+
+# A function that returns the color of the labels with the higher contrast
+# ratio on the given background color
+def _get_contrast_color(background):
+    luminance = _get_luminance(background)
+    dark = (luminance + 0.05) / (_get_luminance(_DARK_FOREGROUND) + 0.05)
+    light = (_get_luminance(_LIGHT_FOREGROUND) + 0.05) / (luminance + 0.05)
+    return _DARK_FOREGROUND if dark >= light else _LIGHT_FOREGROUND
+
+
+# A function that returns the (background, foreground) colors of the tiles with
+# the number 2 ** exponent: the colors in constants.py up to 2048, and the
+# generated colors beyond them (the hue goes around the color wheel by the
+# golden angle for each exponent, so that the close numbers look different).
+# The colors of each exponent are created only once.
+def get_tile_colors(exponent):
+    colors = _tile_colors.get(exponent)
+    if colors is None:
+        number = 2 ** exponent
+        if number in BACKGROUND_COLOR:
+            colors = BACKGROUND_COLOR[number], FOREGROUND_COLOR[number]
+        else:
+            hue = (0.12 + 0.381966 * (exponent - 12)) % 1.0
+            value = 0.72 if exponent % 2 else 0.56
+            red, green, blue = (int(round(255 * channel)) for channel
+                                in colorsys.hsv_to_rgb(hue, 0.62, value))
+            background = Color(red, green, blue)
+            colors = background, _get_contrast_color(background)
+        _tile_colors[exponent] = colors
+    return colors
+
+
+# A function that returns the thickness in pixels of the tile boundaries, the
+# same as the one drawn by stddraw.square with the boundary thickness as the
+# pen radius
+def get_boundary_pixels():
+    return stddraw.penRadiusPixels(Tile.boundary_thickness)
+
+
+# A function that returns the pre-rendered tile (a pygame surface with the
+# background, the boundary and the label) of the number 2 ** exponent with the
+# given size in pixels, each tile is rendered only once
+def get_tile_sprite(exponent, width, height):
+    sprite = _tile_sprites.get((exponent, width, height))
+    if sprite is None:
+        background, foreground = get_tile_colors(exponent)
+        sprite = pygame.Surface((width, height))
+        sprite.fill(_rgb(background))
+        pygame.draw.rect(sprite, _rgb(BOUNDARY_COLOR), sprite.get_rect(),
+                         get_boundary_pixels())
+        font = pygame.font.SysFont(Tile.font_family, Tile.font_size)
+        label = font.render(str(2 ** exponent), True, _rgb(foreground))
+        sprite.blit(label, label.get_rect(center=(width / 2, height / 2)))
+        _tile_sprites[(exponent, width, height)] = sprite
+    return sprite
+
+
+# A class for modeling the worklist of a merge pass (see Tile.merge_tiles). The
+# cells to check are visited in the order of a full scan of the grid (column by
+# column from the bottom row up), so a pass gives the same results as a full
+# scan that checks every cell. When a cell changes, the cells whose merges and
+# moves depend on it (the cell and its neighbors) are visited later in the
+# same pass if the scan has not reached them yet, or they are deferred to the
+# next pass otherwise. The cells are kept as their indexes in the scan order
+# (col * rows + row), so the worklist is a heap of integers.
+class MergeWorklist:
+    # A constructor for creating the worklist of a pass on a grid with the given
+    # dimensions that visits the given cells (deferred by the previous pass)
+    def __init__(self, rows, cols, cells=()):
+        self.rows, self.cols = rows, cols
+        self.heap = sorted(cells)  # a sorted list is a valid heap
+        self.queued = set(self.heap)
+        self.deferred = set()
+        # the index of the last visited cell (the scan only goes forward)
+        self.cursor = -1
+
+    # A method for adding the cells that depend on the given changed cell
+    def add_changed_cell(self, row, col):
+        rows = self.rows
+        index = col * rows + row
+        for neighbor in (index, index - 1 if row > 0 else -1,
+                         index + 1 if row + 1 < rows else -1,
+                         index - rows, index + rows if col + 1 < self.cols else -1):
+            if neighbor < 0:
+                continue
+            if neighbor <= self.cursor:
+                self.deferred.add(neighbor)
+            elif neighbor not in self.queued:
+                self.queued.add(neighbor)
+                heapq.heappush(self.heap, neighbor)
+
+    # A method that returns the (row, col) cell to visit next
+    def pop(self):
+        self.cursor = heapq.heappop(self.heap)
+        col, row = divmod(self.cursor, self.rows)
+        return row, col
 
 
 # A class for modeling numbered tiles as in 2048
 class Tile:
+    # the attributes of a tile (no __dict__ is created for each tile)
+    __slots__ = ('number', 'background_color', 'foreground_color')
+
     # Class variables shared among all Tile objects
     # ---------------------------------------------------------------------------
     # the value of the boundary thickness (for the boxes around the tiles)
@@ -13,34 +141,33 @@ class Tile:
     # font family and font size used for displaying the tile number
     font_family, font_size = "Arial", 14
 
-    # A constructor that creates a tile with 2 as the number on it
-    def __init__(self):
+    # A constructor that creates a tile with the given number on it (2 or 4
+    # chosen randomly by default)
+    def __init__(self, number=None):
         # set the number on this tile
-        self.number = random.choice([2, 4])  # randomly choose 2 or 4
+        if number is None:
+            number = random.choice([2, 4])  # randomly choose 2 or 4
+        self.number = number
         self.update_color(self.number)
 
     # A method for drawing this tile at a given position with a given length
+    # by copying its pre-rendered sprite (see get_tile_sprite)
     def draw(self, position, length=1):  # length defaults to 1
-        # draw the tile as a filled square
-        stddraw.setPenColor(self.background_color)
-        stddraw.filledSquare(position.x, position.y, length / 2)
-
-        stddraw.setPenColor(Color(128, 128, 128))  # Choose a contrasting color for the border
-        # draw the bounding box around the tile as a square
-        stddraw.setPenRadius(Tile.boundary_thickness)
-        stddraw.square(position.x, position.y, length / 2)
-        stddraw.setPenRadius()  # reset the pen radius to its default value
-        # draw the number on the tile
-        stddraw.setPenColor(self.foreground_color)
-        stddraw.setFontFamily(Tile.font_family)
-        stddraw.setFontSize(Tile.font_size)
-        stddraw.text(position.x, position.y, str(self.number))
+        self.draw_at(position.x, position.y, length)
+
+    # A method for drawing this tile centered at the given x and y values (as
+    # the draw method, but without a Point object)
+    def draw_at(self, x, y, length=1):
+        width, height = stddraw.pixelSize(length, length)
+        sprite = get_tile_sprite(self.number.bit_length() - 1, width, height)
+        # the sprite is placed by its bottom left corner
+        stddraw.blit(sprite, x - length / 2, y - length / 2)
 
         # Method for checking two tiles for merging
 
     def merge_matches(self, tile):
         # if the number on the tile is equal to the number on the current tile
-        if self.number == tile.number and self.number < 2048:
+        if self.number == tile.number:
             # set the number on the current tile to the sum of the two numbers
             self.number = self.number * 2
             # increase the score by the value of the number on the current tile
@@ -55,45 +182,59 @@ class Tile:
         else:
             return 0
 
-    # A method for merging two matching tiles
-    def merge_tiles(tile_matrix, score):
-        rows = len(tile_matrix)
-        cols = len(tile_matrix[0])
-
-        for col in range(cols):
-            for row in range(rows):
-                current_tile = tile_matrix[row][col]
-
-                if current_tile is not None:
-                    # Merge with top neighbor if possible
-                    if row < rows - 1 and tile_matrix[row + 1][col] is not None and current_tile.number == \
-                            tile_matrix[row + 1][col].number:
-                        score += current_tile.merge_matches(tile_matrix[row + 1][col])
-                        tile_matrix[row + 1][col] = None
-
-                        # Move merged tile down
-                        for down_row in range(row + 1, rows):
-                            if tile_matrix[down_row][col] is not None:
-                                tile_matrix[down_row - 1][col] = tile_matrix[down_row][col]
-                                tile_matrix[down_row][col] = None
-
-                    # Check neighboring tiles and move current tile if possible
-                    if row > 0:
-                        right_empty = row + 1 >= rows or tile_matrix[row + 1][col] is None
-                        left_empty = row - 1 < 0 or tile_matrix[row - 1][col] is None
-                        up_empty = col + 1 >= cols or tile_matrix[row][col + 1] is None
-                        down_empty = col - 1 < 0 or tile_matrix[row][col - 1] is None
-
-                        if right_empty and left_empty and up_empty and down_empty:
-                            tile_matrix[row - 1][col] = current_tile
-                            tile_matrix[row][col] = None
-                            row -= 1
-
-                    row += 1
-
+    # A method for merging the matching tiles on the given game grid (one pass
+    # of the rules, see GameGrid.settle), returns the updated score. Only the
+    # cells changed since the previous pass (see GameGrid.pop_changed_cells),
+    # their neighbors and the cells deferred by the previous pass are checked
+    # by using a worklist (see MergeWorklist), the other cells cannot be merged
+    # or moved. (The tiles are placed by using the set_tile method of the game
+    # grid.)
+    def merge_tiles(game_grid, score):
+        tile_matrix = game_grid.tile_matrix
+        rows, cols = game_grid.grid_height, game_grid.grid_width
+        worklist = MergeWorklist(rows, cols, game_grid.deferred_merge_cells)
+        for row, col in game_grid.pop_changed_cells():
+            worklist.add_changed_cell(row, col)
+
+        while worklist.heap:
+            row, col = worklist.pop()
+            current_tile = tile_matrix[row][col]
+
+            if current_tile is not None:
+                # Merge with top neighbor if possible
+                if row < rows - 1 and tile_matrix[row + 1][col] is not None and current_tile.number == \
+                        tile_matrix[row + 1][col].number:
+                    score += current_tile.merge_matches(tile_matrix[row + 1][col])
+                    game_grid.n_merges += 1
+                    # the number on the current tile may have changed
+                    game_grid.set_tile(row, col, current_tile)
+                    game_grid.set_tile(row + 1, col, None)
+
+                    # Move merged tile down
+                    for down_row in range(row + 1, rows):
+                        if tile_matrix[down_row][col] is not None:
+                            game_grid.set_tile(down_row - 1, col, tile_matrix[down_row][col])
+                            game_grid.set_tile(down_row, col, None)
+
+                # Check neighboring tiles and move current tile if possible
+                if row > 0:
+                    up_empty = row + 1 >= rows or tile_matrix[row + 1][col] is None
+                    down_empty = tile_matrix[row - 1][col] is None
+                    right_empty = col + 1 >= cols or tile_matrix[row][col + 1] is None
+                    left_empty = col - 1 < 0 or tile_matrix[row][col - 1] is None
+
+                    if up_empty and down_empty and right_empty and left_empty:
+                        game_grid.set_tile(row - 1, col, current_tile)
+                        game_grid.set_tile(row, col, None)
+
+            # check the cells that depend on the changed cells
+            for changed_row, changed_col in game_grid.pop_changed_cells():
+                worklist.add_changed_cell(changed_row, changed_col)
+
+        game_grid.deferred_merge_cells = worklist.deferred
         return score
 
     # A method for updating the color of this tile based on the number on it
     def update_color(self, number):
-        self.background_color = BACKGROUND_COLOR[number]
-        self.foreground_color = FOREGROUND_COLOR[number]
\ No newline at end of file
+        self.background_color, self.foreground_color = \
+            get_tile_colors(number.bit_length() - 1)
\ No newline at end of file
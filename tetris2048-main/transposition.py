@@ -0,0 +1,73 @@
+# A class for modeling a bounded transposition table that stores the results
+# of a search by the Zobrist hash values of the searched positions (see
+# GameGrid.get_hash), so that a position reached again through a different
+# order of moves is not searched again.
+#
+# The table has 2 ** size_bits slots and each hash value maps to one slot. When
+# the slot is already used by another position, the stored entry is replaced
+# if it is from an older search (see new_search) or if the new entry was
+# searched at least as deep (depth-preferred replacement).
+class TranspositionTable:
+    # A constructor for creating an empty table with 2 ** size_bits slots
+    def __init__(self, size_bits=16):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        # the fields of the entries are stored in parallel lists
+        self.keys = [None] * self.size
+        self.depths = [0] * self.size
+        self.values = [None] * self.size
+        self.moves = [None] * self.size
+        self.generations = [0] * self.size
+        # the current search, used for aging the entries of older searches
+        self.generation = 0
+        # the statistics of the table
+        self.hits, self.misses, self.replacements = 0, 0, 0
+
+    # A method for starting a new search (the entries of the previous searches
+    # are kept but they are replaced first)
+    def new_search(self):
+        self.generation += 1
+
+    # A method that returns the (depth, value, move) tuple stored for the
+    # given hash value, or None if the position is not in the table
+    def lookup(self, key):
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            self.hits += 1
+            # an entry that is used again is not old anymore
+            self.generations[slot] = self.generation
+            return self.depths[slot], self.values[slot], self.moves[slot]
+        self.misses += 1
+        return None
+
+    # A method for storing the result of searching the position with the given
+    # hash value to the given depth (returns True if the entry was stored)
+    def store(self, key, depth, value, move=None):
+        slot = key & self.mask
+        stored_key = self.keys[slot]
+        if stored_key is not None and stored_key != key \
+                and self.generations[slot] == self.generation \
+                and self.depths[slot] > depth:
+            return False
+        if stored_key is not None and stored_key != key:
+            self.replacements += 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.generations[slot] = self.generation
+        return True
+
+    # A method for removing all the entries from the table
+    def clear(self):
+        self.keys = [None] * self.size
+        self.depths = [0] * self.size
+        self.values = [None] * self.size
+        self.moves = [None] * self.size
+        self.generations = [0] * self.size
+        self.generation = 0
+        self.hits, self.misses, self.replacements = 0, 0, 0
+
+    # A method that returns the number of used slots
+    def __len__(self):
+        return self.size - self.keys.count(None)
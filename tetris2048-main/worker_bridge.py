@@ -0,0 +1,82 @@
+import logging  # used for reporting the failed computations
+import threading  # used for cancelling the computations
+from concurrent.futures import ThreadPoolExecutor  # used for the worker thread
+
+_logger = logging.getLogger(__name__)
+
+
+# A class for running a computation on snapshots of the game in a background
+# worker while the game loop keeps drawing frames and handling the events. The
+# game loop posts a snapshot with a key that identifies the state it was taken
+# from (e.g. the hash value of the board) and polls for the result in every
+# frame without blocking. When the state changes, posting a snapshot with the
+# new key cancels the computation for the old state, so a result is never
+# returned for a state other than the one it was computed for.
+#
+# The compute function is called in the worker as
+# compute(*snapshot, cancelled=cancelled) where cancelled is a threading.Event
+# that is set when the computation is not needed anymore, so that long
+# computations can stop early. The snapshot must not be changed by the game loop
+# after it is posted (e.g. copies of the grid). A computation that fails (e.g.
+# with a BrokenProcessPool of the advisor) is logged and has no result, so the
+# game loop goes on without it.
+class WorkerBridge:
+    # A constructor for creating a bridge that runs the given compute function
+    # in a worker thread (or in the given concurrent.futures executor)
+    def __init__(self, compute, executor=None):
+        self.compute = compute
+        self.executor = executor if executor is not None \
+            else ThreadPoolExecutor(max_workers=1)
+        # the key of the posted snapshot, the computation for it and its result
+        self.key = None
+        self.future = None
+        self.cancelled = None
+        self.result = None
+        # the exception raised by the last failed computation (or None)
+        self.error = None
+        # the number of computations started, cancelled and failed
+        self.n_posted, self.n_cancelled, self.n_failed = 0, 0, 0
+
+    # A method for starting the computation for the given snapshot of the state
+    # with the given key (the computation for the previous key is cancelled)
+    def post(self, key, *snapshot):
+        self.cancel()
+        self.key = key
+        self.cancelled = threading.Event()
+        self.future = self.executor.submit(self.compute, *snapshot,
+                                           cancelled=self.cancelled)
+        self.n_posted += 1
+
+    # A method that returns the result computed for the state with the given
+    # key, or None if it is not ready yet or the computation has failed (this
+    # method never waits and never raises the exceptions of the computation).
+    # The computation is cancelled if the given key is not the posted key
+    # anymore.
+    def poll(self, key):
+        if key != self.key:
+            self.cancel()
+            return None
+        if self.future is not None and self.future.done():
+            future, self.future = self.future, None
+            try:
+                self.result = future.result()
+            except Exception as error:
+                _logger.exception("the computation for %r has failed", key)
+                self.error = error
+                self.n_failed += 1
+                self.result = None
+        return self.result
+
+    # A method for cancelling the computation for the posted key (the worker
+    # stops it if it has already started and its result is discarded)
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.cancelled.set()
+            self.n_cancelled += 1
+        self.key, self.future, self.cancelled, self.result = None, None, None, None
+
+    # A method for cancelling the computation and stopping the worker
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,49 @@
+import random  # used for generating the random keys
+from tetromino import TETROMINO_TYPES  # the tetromino types that have keys
+
+# the largest exponent of a tile number (2 ** 63) that has keys
+MAX_EXPONENT = 63
+# the seed of the keys, fixed so that the hash values of the same positions
+# are equal in every run and every process (e.g. for replay corpora)
+_SEED = 2048
+# the maximum number of tiles on a tetromino (in the order of its tile matrix)
+_MAX_PIECE_TILES = 8
+
+# the generated cell keys for each grid size
+_cell_keys = {}
+
+# the keys of the current and the next tetromino: a key for each type and a key
+# for each exponent of each tile of the tetromino
+_rng = random.Random(_SEED)
+_type_keys = [{shape: _rng.getrandbits(64) for shape in TETROMINO_TYPES}
+              for _ in range(2)]
+_piece_tile_keys = [[[_rng.getrandbits(64) for _ in range(MAX_EXPONENT + 1)]
+                     for _ in range(_MAX_PIECE_TILES)] for _ in range(2)]
+
+
+# A function that returns the keys of the cells of a grid with the given size
+# as nested lists indexed by [row][col][exponent] (the key of an empty cell,
+# exponent 0, is 0 so that the hash value of an empty grid is 0)
+def get_cell_keys(grid_h, grid_w):
+    keys = _cell_keys.get((grid_h, grid_w))
+    if keys is None:
+        rng = random.Random("%d-%d-%d" % (_SEED, grid_h, grid_w))
+        keys = [[[0] + [rng.getrandbits(64) for _ in range(MAX_EXPONENT)]
+                 for _ in range(grid_w)] for _ in range(grid_h)]
+        _cell_keys[(grid_h, grid_w)] = keys
+    return keys
+
+
+# A function that returns the key of a tetromino (its type and the numbers on
+# its tiles) as the current (slot = 0) or the next (slot = 1) tetromino
+def get_piece_key(tetromino, slot):
+    if tetromino is None:
+        return 0
+    key = _type_keys[slot][tetromino.type]
+    index = 0
+    for row in tetromino.tile_matrix:
+        for tile in row:
+            if tile is not None:
+                key ^= _piece_tile_keys[slot][index][tile.number.bit_length() - 1]
+                index += 1
+    return key